@@ -0,0 +1,303 @@
+"""
+Headless benchmarks of the ReactFlowComponent and ReactFlowEditor sync paths.
+
+Synthetic chain graphs are driven through the same entry points the browser
+uses (change records handed to ReactFlowComponent._handle_msg) and through
+the python side helpers, no browser is needed. For every benchmark the
+latency, the peak of the python allocations (tracemalloc) and the size of the
+json payloads sent to the browser are recorded. The allocations are traced
+in a separate pass, tracemalloc slowing down the timed code considerably.
+
+Run from the repository root:
+
+    python -m benchmarks.sync --sizes 100 1000 10000 --output results.json
+    python -m benchmarks.sync --compare results.json --threshold 1.25
+
+With --compare the run fails (exit code 1) when a benchmark is slower than
+the stored result by more than the threshold factor.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import src.reactflow as rf
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fun):
+        BENCHMARKS[name] = fun
+        return fun
+    return register
+
+
+###############################################################################
+## Synthetic graphs
+###############################################################################
+def make_nodes(n):
+    return [rf.Node(id_=str(i), xy=(i * 10., (i % 100) * 10.), name=f"n{i}")
+            for i in range(n)]
+
+
+def make_edges(nodes):
+    return [rf.Edge(source=a, target=b, weight=0.5)
+            for a, b in zip(nodes[:-1], nodes[1:])]
+
+
+def make_node_dicts(n):
+    return [{"id": str(i), "position": {"x": i * 10., "y": 0.},
+             "data": {"label": f"n{i}"}} for i in range(n)]
+
+
+def make_editor(n):
+    nodes = make_nodes(n)
+    return rf.ReactFlowEditor(nodes=nodes, edges=make_edges(nodes))
+
+
+def capture(component):
+    """ Collect the messages a component sends to the browser """
+    sent = []
+    component._send_msg = sent.append
+    return sent
+
+
+def payload_size(messages):
+    return sum(len(json.dumps(m, default=str)) for m in messages)
+
+
+def sent_params(component, *names):
+    """ Size of the parameters as sent to the browser, defaults stripped """
+    return payload_size([component._process_param_change(
+        {name: getattr(component, name) for name in names})])
+
+
+def changes(nodes=(), edges=()):
+    return {"type": "changes", "nodes": list(nodes), "edges": list(edges)}
+
+
+###############################################################################
+## Benchmarks, each returns (setup, run) where run returns the payload bytes
+###############################################################################
+@benchmark("component.process_nodes")
+def bench_process_nodes(n):
+    component = rf.ReactFlowComponent()
+    def setup():
+        return make_node_dicts(n)
+    def run(nodes):
+        component._process_nodes(nodes)
+        return 0
+    return setup, run
+
+
+@benchmark("component.full_sync")
+def bench_full_sync(n):
+    component = rf.ReactFlowComponent()
+    def setup():
+        return make_node_dicts(n)
+    def run(nodes):
+        component.nodes = nodes
+        return sent_params(component, "reactflow_nodes")
+    return setup, run
+
+
+@benchmark("edge.from_reactflow")
+def bench_edge_from_reactflow(n):
+    nodes = make_nodes(n)
+    d_nodes = {node.id_: node for node in nodes}
+    def setup():
+        return [{"id": f"e{i}", "source": str(i), "target": str(i + 1),
+                 "data": {"weight": 0.5}} for i in range(n - 1)]
+    def run(edges):
+        for e in edges:
+            rf.Edge.from_reactflow(d_nodes, e)
+        return 0
+    return setup, run
+
+
+@benchmark("store.from_elements")
+def bench_store_from_elements(n):
+    nodes = make_nodes(n)
+    edges = make_edges(nodes)
+    def setup():
+        return None
+    def run(_):
+        rf.GraphStore.from_elements(nodes, edges)
+        return 0
+    return setup, run
+
+
+@benchmark("editor.nodes_to_df")
+def bench_nodes_to_df(n):
+    editor = make_editor(n)
+    def setup():
+        return None
+    def run(_):
+        editor._nodes_to_df()
+        return 0
+    return setup, run
+
+
+@benchmark("editor.update_ui")
+def bench_update_ui(n):
+    editor = make_editor(n)
+    sent = capture(editor._reactflow)
+    def setup():
+        sent.clear()
+        return None
+    def run(_):
+        editor._update_ui()
+        return payload_size(sent) + sent_params(
+            editor._reactflow, "reactflow_nodes", "edges")
+    return setup, run
+
+
+def _editor_event(n, make_msg):
+    editor = make_editor(n)
+    component = editor._reactflow
+    sent = capture(component)
+    state = {"i": 0}
+    def setup():
+        sent.clear()
+        state["i"] += 1
+        return make_msg(editor, state["i"])
+    def run(msg):
+        component._handle_msg(msg)
+        return len(json.dumps(msg)) + payload_size(sent)
+    return setup, run
+
+
+@benchmark("editor.drag")
+def bench_drag(n):
+    return _editor_event(n, lambda editor, i: changes(nodes=[{
+        "type": "position", "id": str(i % n),
+        "position": {"x": float(i), "y": float(i)}}]))
+
+
+@benchmark("editor.select")
+def bench_select(n):
+    return _editor_event(n, lambda editor, i: changes(nodes=[
+        {"type": "select", "id": str(i % n), "selected": True},
+        {"type": "select", "id": str((i - 1) % n), "selected": False},
+    ]))
+
+
+@benchmark("editor.connect")
+def bench_connect(n):
+    return _editor_event(n, lambda editor, i: changes(edges=[{
+        "type": "add", "item": {"id": f"new{i}", "source": str(i % n),
+                                "target": str((i * 7 + 3) % n)}}]))
+
+
+@benchmark("editor.delete")
+def bench_delete(n):
+    def make_msg(editor, i):
+        return changes(nodes=[{"type": "remove",
+                               "id": editor.graph.ids("nodes")[0]}])
+    return _editor_event(n, make_msg)
+
+
+###############################################################################
+## Runner
+###############################################################################
+def measure(name, n, repeat):
+    setup, run = BENCHMARKS[name](n)
+    timings, peaks, payloads = [], [], []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        payload = run(arg)
+        timings.append(time.perf_counter() - start)
+        payloads.append(payload)
+    for _ in range(repeat):
+        arg = setup()
+        tracemalloc.start()
+        try:
+            run(arg)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return {
+        "benchmark": name,
+        "n": n,
+        "min_s": min(timings),
+        "median_s": sorted(timings)[len(timings) // 2],
+        "peak_alloc_bytes": max(peaks),
+        "payload_bytes": max(payloads),
+    }
+
+
+def metadata():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """ Print the ratio to the baseline, returns the regressed benchmarks """
+    previous = {(r["benchmark"], r["n"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["benchmark"], r["n"]))
+        if old is None:
+            continue
+        ratio = r["median_s"] / old["median_s"] if old["median_s"] else 1.
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(r)
+        print(f"{r['benchmark']:<28}{r['n']:>8}  x{ratio:6.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                        help="only run these benchmarks")
+    parser.add_argument("--output", type=Path,
+                        help="write the results to this json file")
+    parser.add_argument("--compare", type=Path,
+                        help="json file of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown factor reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.only or BENCHMARKS:
+        for n in args.sizes:
+            result = measure(name, n, args.repeat)
+            results.append(result)
+            print(f"{name:<28}{n:>8}  {result['median_s'] * 1e3:10.3f} ms"
+                  f"  {result['peak_alloc_bytes'] / 1e6:8.2f} MB"
+                  f"  {result['payload_bytes']:>10} B")
+
+    if args.output:
+        args.output.write_text(json.dumps(
+            {"metadata": metadata(), "results": results}, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ import src.reactflow as rf
 
 from importlib import reload
 reload(rf)
+rf.extension()
 
 
 def get_flow():
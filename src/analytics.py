@@ -0,0 +1,332 @@
+"""
+Reachability and path queries over the edges of a GraphStore. The edges are
+held as compressed adjacency arrays (CSR) per direction, rebuilt only after
+the graph structure changed, and traversals advance a whole BFS level at a
+time with array operations.
+
+Results are cached per weakly connected component: a traversal never leaves
+the component of its start node, so adding or removing an edge only drops
+the cached results of the components at its ends. Components are merged as
+soon as an edge joins them, and split before the next query once edges or
+nodes were removed. The index is updated from React Flow change records (see
+ReactFlowEditor).
+"""
+import heapq
+from itertools import count
+import math
+
+import numpy as np
+
+from .layout import _gather
+
+DIRECTIONS = ("downstream", "upstream", "both")
+
+
+def components(n, sources, targets):
+    """
+    Weakly connected component labels of n nodes (the index of one node of
+    the component) by hooking the roots of the ends of each edge together
+    and pointer jumping.
+    """
+    label = np.arange(n)
+    while True:
+        ls, lt = label[sources], label[targets]
+        if (ls == lt).all():
+            return label
+        low = np.minimum(ls, lt)
+        np.minimum.at(label, ls, low)
+        np.minimum.at(label, lt, low)
+        while True:
+            jumped = label[label]
+            if (jumped == label).all():
+                break
+            label = jumped
+
+
+def _directions(direction):
+    if direction not in DIRECTIONS:
+        raise ValueError(
+            f"direction must be one of {DIRECTIONS}, not {direction!r}")
+    return ("downstream", "upstream") if direction == "both" else (direction,)
+
+
+class GraphAnalytics:
+    """ Cached traversals of the graph of a GraphStore, keyed by node id """
+
+    def __init__(self, store):
+        self._store = store
+        self._adjacency = None
+        self._ends = {}
+        self._label = {}
+        self._members = {}
+        self._cache = {}
+        # components which may have been split by a removal
+        self._dirty = set()
+        self._labels = count()
+
+    @classmethod
+    def from_store(cls, store):
+        analytics = cls(store)
+        ids = store.ids("nodes").tolist()
+        sources = store.column("edges", "source")
+        targets = store.column("edges", "target")
+        analytics._ends = {
+            id_: (ids[s], ids[t]) for id_, s, t in zip(
+                store.ids("edges").tolist(), sources.tolist(), targets.tolist())}
+        analytics._assign(ids, components(len(ids), sources, targets))
+        return analytics
+
+    def _assign(self, ids, labels):
+        unique, inverse = np.unique(labels, return_inverse=True)
+        new = [next(self._labels) for _ in range(len(unique))]
+        for id_, i in zip(ids, inverse.ravel().tolist()):
+            self._label[id_] = new[i]
+            self._members.setdefault(new[i], set()).add(id_)
+
+    ###########################################################################
+    ## Updates
+    ###########################################################################
+    def update(self, table, changes):
+        """ Drop the results of the components touched by change records """
+        for change in changes:
+            kind = change["type"]
+            if kind not in ("add", "remove", "replace"):
+                continue
+            if table == "nodes":
+                # replaced nodes keep their edges
+                if kind == "add":
+                    self._add_node(change["item"]["id"])
+                elif kind == "remove":
+                    self._remove_node(change["id"])
+                continue
+            self._adjacency = None
+            if kind == "remove":
+                self._remove_edge(change["id"])
+                continue
+            item = change.get("item")
+            if item is None:
+                # replace records without item only refresh the tables (e.g.
+                # after a node rename), treat them as a weight change
+                ends = self._ends.get(change["id"])
+                if ends is not None:
+                    self._invalidate(self._label.get(ends[0]))
+                continue
+            ends = (item["source"], item["target"])
+            if kind == "replace" and self._ends.get(change["id"]) == ends:
+                # the weight changed, and with it the weighted paths
+                self._invalidate(self._label.get(ends[0]))
+                continue
+            self._remove_edge(item["id"])
+            self._add_edge(item["id"], *ends)
+
+    def _add_node(self, id_):
+        label = next(self._labels)
+        self._label[id_] = label
+        self._members[label] = {id_}
+        self._adjacency = None
+
+    def _remove_node(self, id_):
+        label = self._label.pop(id_, None)
+        if label is not None:
+            self._members[label].discard(id_)
+            self._invalidate(label)
+            self._dirty.add(label)
+        self._adjacency = None
+
+    def _add_edge(self, id_, source, target):
+        self._ends[id_] = (source, target)
+        for end in (source, target):
+            if end not in self._label:
+                self._add_node(end)
+        a, b = self._label[source], self._label[target]
+        self._invalidate(a)
+        if a == b:
+            return
+        self._invalidate(b)
+        if len(self._members[a]) < len(self._members[b]):
+            a, b = b, a
+        for id_ in self._members[b]:
+            self._label[id_] = a
+        self._members[a] |= self._members.pop(b)
+        if b in self._dirty:
+            self._dirty.discard(b)
+            self._dirty.add(a)
+
+    def _remove_edge(self, id_):
+        for end in self._ends.pop(id_, ()):
+            label = self._label.get(end)
+            if label is not None:
+                self._invalidate(label)
+                self._dirty.add(label)
+
+    def _invalidate(self, label):
+        self._cache.pop(label, None)
+
+    def _refresh(self):
+        """ Rebuild the adjacency arrays and split the dirty components """
+        store = self._store
+        sources = store.column("edges", "source")
+        targets = store.column("edges", "target")
+        if self._adjacency is None:
+            n = store.n_nodes
+            weights = np.nan_to_num(store.column("edges", "weight"), nan=1.)
+            self._adjacency = {}
+            for direction, rows, cols, w in (
+                    ("downstream", sources, targets, weights),
+                    ("upstream", targets, sources, weights),
+                    ("undirected", np.concatenate([sources, targets]),
+                     np.concatenate([targets, sources]),
+                     np.concatenate([weights, weights]))):
+                order = np.argsort(rows, kind="stable")
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+                self._adjacency[direction] = (indptr, cols[order], w[order])
+        if self._dirty:
+            ids = [id_ for label in self._dirty
+                   for id_ in self._members.pop(label, ())]
+            self._dirty = set()
+            local = np.full(store.n_nodes, -1, dtype=np.int64)
+            local[store.rows("nodes", ids)] = np.arange(len(ids))
+            # components are closed, edges leaving a dirty one don't exist
+            inside = local[sources] >= 0
+            self._assign(ids, components(
+                len(ids), local[sources[inside]], local[targets[inside]]))
+
+    def component(self, id_):
+        """ Ids of the nodes weakly connected to the node """
+        self._refresh()
+        return list(self._members[self._label[id_]])
+
+    ###########################################################################
+    ## Queries
+    ###########################################################################
+    def _levels(self, id_, direction):
+        """ Ids of the nodes reached from the node with their BFS depth """
+        cache = self._cache.setdefault(self._label[id_], {})
+        key = ("levels", id_, direction)
+        if key not in cache:
+            indptr, indices, _ = self._adjacency[direction]
+            depth = np.full(len(indptr) - 1, -1, dtype=np.int64)
+            frontier = np.array([self._store._rows["nodes"][id_]])
+            depth[frontier] = level = 0
+            while len(frontier):
+                level += 1
+                frontier = np.unique(_gather(indptr, indices, frontier))
+                frontier = frontier[depth[frontier] < 0]
+                depth[frontier] = level
+            rows = np.flatnonzero(depth >= 0)
+            cache[key] = self._store.ids("nodes")[rows], depth[rows]
+        return cache[key]
+
+    def distances(self, id_, direction="downstream"):
+        """ Number of edges from the node to each node it reaches """
+        if direction == "both":
+            raise ValueError("distances are computed in a single direction")
+        self._refresh()
+        ids, depth = self._levels(id_, direction)
+        return dict(zip(ids.tolist(), depth.tolist()))
+
+    def reachable(self, ids, direction="downstream", max_depth=None):
+        """
+        Ids of the nodes reached from any of the given nodes, these included,
+        following the edges downstream, upstream or both (the union of the
+        two), at most max_depth edges away.
+        """
+        directions = _directions(direction)
+        self._refresh()
+        found = {}
+        for d in directions:
+            reached = {}
+            for id_ in ids:
+                # the nodes reached from a reached node are already found
+                if max_depth is None and id_ in reached:
+                    continue
+                nodes, depth = self._levels(id_, d)
+                if max_depth is not None:
+                    nodes = nodes[depth <= max_depth]
+                reached.update(dict.fromkeys(nodes.tolist()))
+            found.update(reached)
+        return list(found)
+
+    def lineage(self, ids, direction="both"):
+        """
+        Ids of the nodes reachable from the given nodes and of the edges
+        leading to them, see reachable.
+        """
+        store = self._store
+        nodes, edges = {}, np.zeros(store.n_edges, dtype=bool)
+        for d in _directions(direction):
+            reached = self.reachable(ids, d)
+            nodes.update(dict.fromkeys(reached))
+            mask = np.zeros(store.n_nodes, dtype=bool)
+            mask[store.rows("nodes", reached)] = True
+            ends = "source" if d == "downstream" else "target"
+            edges |= mask[store.column("edges", ends)]
+        return list(nodes), store.ids("edges")[edges].tolist()
+
+    def shortest_path(self, source, target, weighted=False, directed=True):
+        """
+        Ids of the nodes on a shortest path from source to target, or None
+        if there is no path. Weighted paths use the edge weights as lengths,
+        edges without a weight count as 1. Paths follow the edge directions
+        unless directed is False.
+        """
+        self._refresh()
+        label = self._label[source]
+        if self._label[target] != label:
+            return None
+        cache = self._cache.setdefault(label, {})
+        key = ("path", source, target, weighted, directed)
+        if key not in cache:
+            rows = self._store._rows["nodes"]
+            search = self._dijkstra if weighted else self._bfs_path
+            path = search(rows[source], rows[target], self._adjacency[
+                "downstream" if directed else "undirected"])
+            cache[key] = None if path is None else \
+                self._store.ids("nodes")[path].tolist()
+        path = cache[key]
+        return None if path is None else list(path)
+
+    @staticmethod
+    def _bfs_path(start, end, adjacency):
+        indptr, indices, _ = adjacency
+        parent = np.full(len(indptr) - 1, -1, dtype=np.int64)
+        parent[start] = start
+        frontier = np.array([start])
+        while len(frontier) and parent[end] < 0:
+            origins = np.repeat(frontier, indptr[frontier + 1] - indptr[frontier])
+            reached = _gather(indptr, indices, frontier)
+            new = parent[reached] < 0
+            frontier, first = np.unique(reached[new], return_index=True)
+            parent[frontier] = origins[new][first]
+        if parent[end] < 0:
+            return None
+        path = [end]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
+
+    @staticmethod
+    def _dijkstra(start, end, adjacency):
+        indptr, indices, weights = adjacency
+        distance, parent = {start: 0.}, {start: start}
+        heap, done = [(0., start)], set()
+        while heap:
+            d, row = heapq.heappop(heap)
+            if row == end:
+                break
+            if row in done:
+                continue
+            done.add(row)
+            a, b = indptr[row], indptr[row + 1]
+            for nxt, w in zip(indices[a:b].tolist(), weights[a:b].tolist()):
+                if d + w < distance.get(nxt, math.inf):
+                    distance[nxt] = d + w
+                    parent[nxt] = row
+                    heapq.heappush(heap, (d + w, nxt))
+        if end not in parent:
+            return None
+        path = [end]
+        while path[-1] != start:
+            path.append(parent[path[-1]])
+        return path[::-1]
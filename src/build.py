@@ -0,0 +1,51 @@
+"""
+Build the offline assets of ReactFlowComponent: a minified ESM bundle of
+reactflow.js with @xyflow/react and React included, and the React Flow
+stylesheet, both written to src/dist. With these files present the
+component is served entirely from the Panel server (cacheable by the
+browsers) and works without access to esm.sh or jsdelivr.
+
+    python -m src.build [--build-dir DIR] [--unminified]
+
+Requires npm and esbuild, see `panel compile`.
+"""
+import argparse
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+
+from panel.io.compile import compile_components
+
+from .reactflow import ReactFlowComponent, _BUNDLE, _CSS
+
+
+def build(build_dir=None, minify=True, verbose=True):
+    """ Write the bundle and the stylesheet to src/dist """
+    _BUNDLE.parent.mkdir(exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        build_dir = Path(build_dir or tmp).absolute()
+        ret = compile_components(
+            [ReactFlowComponent], build_dir=build_dir, outfile=_BUNDLE,
+            minify=minify, verbose=verbose)
+        if ret != 0:
+            raise RuntimeError("Compiling the ReactFlowComponent bundle failed")
+        css = build_dir / "node_modules" / "@xyflow" / "react" / "dist" / \
+            "style.css"
+        shutil.copyfile(css, _CSS)
+    return _BUNDLE, _CSS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--build-dir", help="""
+        Directory for the npm project, kept to speed up later builds""")
+    parser.add_argument("--unminified", action="store_true")
+    args = parser.parse_args(argv)
+    for path in build(args.build_dir, minify=not args.unminified):
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
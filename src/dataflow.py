@@ -0,0 +1,298 @@
+"""
+Optional execution engine evaluating the graph of a ReactFlowComponent:
+nodes are functions and edges carry the output of their source to their
+target.
+
+The function of a node is called as fn(inputs, **values) with inputs a
+dict mapping the ids of the upstream nodes to their outputs and values the
+values of the widgets in the pane of the node, keyed by widget name.
+Outputs are memoized on the upstream outputs and the widget values, so a
+widget change or an edge change only recomputes the nodes downstream of
+it. Independent nodes run concurrently when an executor (thread or process
+pool) is given.
+
+>>> flow = Dataflow(component, functions={"load": load, "fit": fit})
+>>> flow.run()
+>>> flow.results["fit"]
+"""
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, wait
+import hashlib
+import pickle
+
+import panel as pn
+import param
+
+
+class CycleError(ValueError):
+    """ The graph has a cycle, ids are the nodes on or after it """
+
+    def __init__(self, ids):
+        super().__init__(f"The graph has a cycle through {ids}")
+        self.ids = ids
+
+
+class Dataflow(param.Parameterized):
+    """ Evaluates the nodes of a ReactFlowComponent in dependency order """
+
+    results = param.Dict(default={}, doc="""
+        Output of each evaluated node, by node id.""")
+    errors = param.Dict(default={}, doc="""
+        Exception raised by each failed node, its downstream nodes are not
+        evaluated. With automatic runs, the nodes on or after a cycle get
+        the CycleError.""")
+    auto = param.Boolean(default=True, doc="""
+        Recompute the affected nodes whenever a pane widget, an edge or the
+        node list changes.""")
+    cache_size = param.Integer(default=1, bounds=(1, None), doc="""
+        Number of memoized outputs kept per node.""")
+
+    def __init__(self, component, functions, executor=None, **params):
+        super().__init__(**params)
+        self._component = component
+        self._functions = dict(functions)
+        self._executor = executor
+        self._cache = defaultdict(dict)
+        self._keys = {}
+        self._targets = {}
+        self._widget_watchers = {}
+        component.on_change(self._graph_changed)
+        component.param.watch(self._elements_replaced,
+                              ["reactflow_nodes", "edges"])
+        component.param.watch(self._watch_panes, "panel_nodes")
+        self._watch_panes()
+
+    ###########################################################################
+    ## Graph
+    ###########################################################################
+    def _upstream(self):
+        """ Upstream node ids of each node, in edge order """
+        ids = {n["id"] for n in self._component.reactflow_nodes}
+        upstream = {id_: [] for id_ in ids}
+        self._targets = {e["id"]: e["target"] for e in self._component.edges}
+        for e in self._component.edges:
+            if e["source"] in ids and e["target"] in ids:
+                upstream[e["target"]].append(e["source"])
+        return upstream
+
+    @staticmethod
+    def topological_order(upstream):
+        """ Node ids ordered so that every node follows its upstream nodes """
+        indegree = {id_: len(set(sources)) for id_, sources in upstream.items()}
+        downstream = defaultdict(set)
+        for id_, sources in upstream.items():
+            for source in sources:
+                downstream[source].add(id_)
+        ready = [id_ for id_, n in indegree.items() if not n]
+        order = []
+        while ready:
+            id_ = ready.pop()
+            order.append(id_)
+            for target in downstream[id_]:
+                indegree[target] -= 1
+                if not indegree[target]:
+                    ready.append(target)
+        if len(order) != len(upstream):
+            raise CycleError(sorted(id_ for id_, n in indegree.items() if n))
+        return order
+
+    @staticmethod
+    def downstream_cone(upstream, ids):
+        """ The given nodes and all the nodes depending on them """
+        downstream = defaultdict(set)
+        for id_, sources in upstream.items():
+            for source in sources:
+                downstream[source].add(id_)
+        cone, todo = set(), list(ids)
+        while todo:
+            id_ = todo.pop()
+            if id_ in cone or id_ not in upstream:
+                continue
+            cone.add(id_)
+            todo.extend(downstream[id_])
+        return cone
+
+    ###########################################################################
+    ## Widgets
+    ###########################################################################
+    def _pane_widgets(self, id_):
+        pane = self._component._panes.get(id_)
+        if pane is None:
+            return []
+        if isinstance(pane, pn.widgets.Widget):
+            return [pane]
+        if hasattr(pane, "select"):
+            return [w for w in pane.select(pn.widgets.Widget)
+                    if "value" in w.param]
+        return []
+
+    def values(self, id_):
+        """ Widget values of the pane of a node, by widget name """
+        return {w.name: w.value for w in self._pane_widgets(id_)}
+
+    def _watch_panes(self, event=None):
+        """ Watch the widgets of the mounted panes """
+        for widget, watcher in self._widget_watchers.values():
+            widget.param.unwatch(watcher)
+        self._widget_watchers = {}
+        for id_ in self._component._panes:
+            for widget in self._pane_widgets(id_):
+                watcher = widget.param.watch(
+                    lambda event, id_=id_: self._widget_changed(id_), "value")
+                self._widget_watchers[(id_, id(widget))] = (widget, watcher)
+
+    ###########################################################################
+    ## Invalidation
+    ###########################################################################
+    def _widget_changed(self, id_):
+        if self.auto:
+            self._run_auto([id_])
+
+    def _graph_changed(self, change):
+        """ Recompute the targets of the added and removed edges """
+        if not self.auto:
+            return
+        if any(r["type"] in ("add", "remove") for r in change.nodes):
+            self._run_auto()
+            return
+        changed = set()
+        for record in change.edges:
+            if record["type"] in ("add", "replace"):
+                changed.add(record["item"]["target"])
+            elif record["type"] == "remove":
+                changed.add(self._targets.get(record["id"]))
+        changed.discard(None)
+        if changed:
+            self._run_auto(changed)
+
+    def _elements_replaced(self, event):
+        if self.auto:
+            self._run_auto()
+
+    def _run_auto(self, changed=None):
+        """ Run from a callback, a cycle (e.g. connected in the browser) is
+        recorded in errors instead of raised """
+        try:
+            self.run(changed)
+        except CycleError as e:
+            blocked = set(e.ids)
+            self.param.update(
+                results={id_: v for id_, v in self.results.items()
+                         if id_ not in blocked},
+                errors={**{id_: v for id_, v in self.errors.items()
+                           if id_ not in blocked},
+                        **dict.fromkeys(e.ids, e)})
+
+    ###########################################################################
+    ## Execution
+    ###########################################################################
+    def run(self, changed=None):
+        """
+        Evaluate the nodes downstream of the changed node ids, or all nodes.
+        Memoized outputs are reused when the inputs and widget values did
+        not change. Nodes downstream of a failed node or of a node without
+        function are skipped. Raises CycleError if the graph has a cycle.
+        """
+        upstream = self._upstream()
+        order = self.topological_order(upstream)
+        todo = set(order) if changed is None else self.downstream_cone(
+            upstream, changed)
+        results = {id_: v for id_, v in self.results.items()
+                   if id_ in upstream and id_ not in todo}
+        errors = {id_: v for id_, v in self.errors.items()
+                  if id_ in upstream and id_ not in todo}
+        for id_ in list(self._keys):
+            if id_ not in upstream:
+                del self._keys[id_]
+                self._cache.pop(id_, None)
+
+        pending = {id_: set(upstream[id_]) & todo for id_ in todo}
+        running = {}
+        while pending or running:
+            ready = [id_ for id_ in order if id_ in pending and not pending[id_]]
+            for id_ in ready:
+                del pending[id_]
+                # inputs missing from results come from failed or skipped
+                # nodes, so the whole downstream cone is skipped
+                if any(s not in results for s in upstream[id_]) or \
+                        id_ not in self._functions:
+                    self._skip(id_, pending)
+                    continue
+                inputs = {s: results.get(s) for s in upstream[id_]}
+                values = self.values(id_)
+                key = self._key(id_, upstream[id_], values)
+                self._keys[id_] = key
+                if key in self._cache[id_]:
+                    results[id_] = self._cache[id_][key]
+                    self._done(id_, pending)
+                    continue
+                running[self._submit(id_, inputs, values)] = (id_, key)
+            if not running:
+                continue
+            done = self._wait(running)
+            for future in done:
+                id_, key = running.pop(future)
+                try:
+                    results[id_] = self._store(id_, key, future.result())
+                except Exception as e:
+                    errors[id_] = e
+                    results.pop(id_, None)
+                self._done(id_, pending)
+        self.param.update(results=results, errors=errors)
+        return results
+
+    def _key(self, id_, sources, values):
+        """ Memo key of a node from the keys of its inputs and its values """
+        try:
+            frozen = pickle.dumps(sorted(values.items()), protocol=4)
+        except Exception:
+            frozen = repr(sorted(values.items())).encode()
+        digest = hashlib.sha1(id_.encode())
+        for source in sources:
+            digest.update(self._keys.get(source, "").encode())
+        digest.update(frozen)
+        return digest.hexdigest()
+
+    def _store(self, id_, key, output):
+        cache = self._cache[id_]
+        cache[key] = output
+        while len(cache) > self.cache_size:
+            del cache[next(iter(cache))]
+        return output
+
+    def _submit(self, id_, inputs, values):
+        if self._executor is None:
+            return _Immediate(self._functions[id_], inputs, values)
+        return self._executor.submit(self._functions[id_], inputs, **values)
+
+    @staticmethod
+    def _wait(running):
+        immediate = [f for f in running if isinstance(f, _Immediate)]
+        if immediate:
+            return immediate
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        return done
+
+    @staticmethod
+    def _done(id_, pending):
+        for deps in pending.values():
+            deps.discard(id_)
+
+    def _skip(self, id_, pending):
+        self._keys.pop(id_, None)
+        self._done(id_, pending)
+
+
+class _Immediate:
+    """ Future-like result of a function run on the calling thread """
+
+    def __init__(self, fn, inputs, values):
+        try:
+            self._result, self._error = fn(inputs, **values), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
@@ -0,0 +1,197 @@
+"""
+Hierarchical node groups of a ReactFlowEditor. A collapsed group is shown
+on the canvas as a single aggregate node, its edges to the rest of the graph
+merged into one edge per neighbour with the mean weight. Only the nodes
+and edges of the visible level are built and sent to the browser.
+
+Groups hold nodes and other groups; a node inside nested collapsed groups is
+represented by the outermost one.
+"""
+import numpy as np
+
+
+GROUP_PREFIX = "group:"
+GROUP_EDGE_PREFIX = "group-edge:"
+
+
+class NodeGroups:
+    """ Group membership and collapsed state, keyed by node id """
+
+    def __init__(self):
+        self._group_of = {}
+        self._parent = {}
+        self._collapsed = set()
+        self._top = None
+
+    def __contains__(self, name):
+        return name in self._parent
+
+    def __iter__(self):
+        return iter(self._parent)
+
+    @property
+    def collapsed(self):
+        return set(self._collapsed)
+
+    def add(self, name, ids=(), groups=(), collapsed=True):
+        """ Define a group of nodes and subgroups, nodes move out of their
+        previous group """
+        for group in groups:
+            if group not in self._parent:
+                raise KeyError(f"Unknown group {group!r}")
+            if name == group or name in self._ancestors(group):
+                raise ValueError(f"Group {group!r} cannot contain {name!r}")
+        self._parent.setdefault(name, None)
+        for id_ in ids:
+            self._group_of[id_] = name
+        for group in groups:
+            self._parent[group] = name
+        if collapsed:
+            self._collapsed.add(name)
+        self._top = None
+
+    def remove(self, name):
+        """ Drop a group, its members move to the parent group """
+        parent = self._parent.pop(name)
+        self._collapsed.discard(name)
+        for id_, group in list(self._group_of.items()):
+            if group == name:
+                if parent is None:
+                    del self._group_of[id_]
+                else:
+                    self._group_of[id_] = parent
+        for group, p in self._parent.items():
+            if p == name:
+                self._parent[group] = parent
+        self._top = None
+
+    def discard(self, ids):
+        """ Forget removed nodes, returns their groups by node id """
+        removed = {}
+        for id_ in ids:
+            group = self._group_of.pop(id_, None)
+            if group is not None:
+                removed[id_] = group
+        return removed
+
+    def restore(self, groups):
+        """ Put nodes back in their groups (those still defined) """
+        for id_, group in groups.items():
+            if group in self._parent:
+                self._group_of[id_] = group
+
+    def collapse(self, names):
+        self._collapsed.update(self._check(names))
+        self._top = None
+
+    def expand(self, names):
+        self._collapsed.difference_update(self._check(names))
+        self._top = None
+
+    def _check(self, names):
+        unknown = [n for n in names if n not in self._parent]
+        if unknown:
+            raise KeyError(f"Unknown groups {unknown}")
+        return names
+
+    def _ancestors(self, name):
+        ancestors = []
+        while (name := self._parent.get(name)) is not None:
+            ancestors.append(name)
+        return ancestors
+
+    def parent(self, name):
+        return self._parent[name]
+
+    def group_of(self, id_):
+        return self._group_of.get(id_)
+
+    def hidden_by(self, id_):
+        """ Outermost collapsed group containing the node, or None """
+        if self._top is None:
+            self._top = {}
+            for name in self._parent:
+                top = None
+                for group in [name] + self._ancestors(name):
+                    if group in self._collapsed:
+                        top = group
+                self._top[name] = top
+        group = self._group_of.get(id_)
+        return None if group is None else self._top[group]
+
+    ###########################################################################
+    ## Projection
+    ###########################################################################
+    def project(self, store):
+        """
+        React Flow nodes and edges of the visible level: the nodes outside
+        collapsed groups, one aggregate node per outermost collapsed group
+        and the edges between them, merged where an end is an aggregate.
+        Also returns the projection state used to translate later change
+        records: the members of each aggregate, the ids of the edges shown
+        unchanged and the ids of the hidden nodes.
+        """
+        ids = store.ids("nodes")
+        n = len(ids)
+        hidden_by = [self.hidden_by(id_) for id_ in ids.tolist()]
+        hidden = np.array([g is not None for g in hidden_by], dtype=bool)
+        groups = list(dict.fromkeys(g for g in hidden_by if g is not None))
+        index = {g: i for i, g in enumerate(groups)}
+        code = np.arange(n)
+        code[hidden] = n + np.array(
+            [index[g] for g in hidden_by if g is not None], dtype=np.int64)
+
+        nodes = store.nodes_to_reactflow(np.flatnonzero(~hidden))
+        members = {g: [] for g in groups}
+        for id_, g in zip(ids[hidden].tolist(), np.array(
+                hidden_by, dtype=object)[hidden].tolist()):
+            members[g].append(id_)
+        x, y = aggregate_positions(store, members)
+        nodes += [{
+            "id": GROUP_PREFIX + g,
+            "position": {"x": x[i], "y": y[i]},
+            "data": {"label": f"{g} ({len(members[g])})", "group": g,
+                     "size": len(members[g])},
+            "deletable": False,
+        } for i, g in enumerate(groups)]
+
+        sources = code[store.column("edges", "source")]
+        targets = code[store.column("edges", "target")]
+        keep = sources != targets
+        direct = keep & (sources < n) & (targets < n)
+        edges = store.edges_to_reactflow(np.flatnonzero(direct))
+        direct_ids = set(store.ids("edges")[direct].tolist())
+        merged = keep & ~direct
+        if merged.any():
+            labels = np.concatenate([
+                ids, np.array([GROUP_PREFIX + g for g in groups], dtype=object)])
+            pairs, inverse, counts = np.unique(
+                np.column_stack([sources[merged], targets[merged]]), axis=0,
+                return_inverse=True, return_counts=True)
+            # mean of the weights given, weights stay within [0, 1]
+            weight = store.column("edges", "weight")[merged]
+            total = np.bincount(inverse.ravel(), minlength=len(pairs),
+                                weights=np.nan_to_num(weight))
+            given = np.bincount(inverse.ravel(), minlength=len(pairs),
+                                weights=~np.isnan(weight))
+            weights = [t / g if g else None
+                       for t, g in zip(total.tolist(), given.tolist())]
+            edges += [{
+                "id": f"{GROUP_EDGE_PREFIX}{labels[s]}->{labels[t]}",
+                "source": labels[s],
+                "target": labels[t],
+                "data": {"weight": w, "count": c},
+                "deletable": False,
+            } for (s, t), w, c in zip(pairs.tolist(), weights,
+                                      counts.tolist())]
+        return nodes, edges, {"members": members, "edges": direct_ids,
+                              "hidden": set(ids[hidden].tolist())}
+
+
+def aggregate_positions(store, members):
+    """ Centroids of the member nodes of each group, in the given order """
+    x = store.column("nodes", "x")
+    y = store.column("nodes", "y")
+    rows = [store.rows("nodes", ids) for ids in members.values()]
+    return ([float(x[r].mean()) for r in rows],
+            [float(y[r].mean()) for r in rows])
@@ -0,0 +1,147 @@
+"""
+Undo/redo history of a ReactFlowEditor. Edits are recorded as compact
+inverse operations (previous positions, selection, names or weights, ids of
+added elements and the columns of removed rows) instead of snapshots of the
+whole graph.
+
+An operation is a tuple whose first item is its kind:
+
+* ("move", ids, x, y, dragging): previous positions of nodes
+* ("select", table, ids, selected): previous selection state
+* ("rename", id_, name): previous node name
+* ("weight", id_, weight): previous edge weight
+* ("add", node_ids, edge_ids): added elements
+* ("remove", nodes, edges): GraphStore.snapshot of the removed rows
+"""
+from collections import deque
+from contextlib import contextmanager
+import sys
+
+import numpy as np
+
+
+def _nbytes(obj):
+    """ Rough memory footprint of an operation """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(sys.getsizeof(v) for v in obj)
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class History:
+    """
+    Undo and redo stacks of operation lists. Operations recorded while a
+    group is open form a single entry. The undo stack is trimmed from the
+    oldest entry to stay within max_bytes.
+    """
+
+    def __init__(self, max_bytes=2 ** 24):
+        self.max_bytes = max_bytes
+        self._undo = deque()
+        self._redo = []
+        self._pending = []
+        self._depth = 0
+        self._target = None
+        self._nbytes = 0
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    @property
+    def nbytes(self):
+        """ Estimated memory used by the recorded entries """
+        return self._nbytes
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._pending = []
+        self._nbytes = 0
+
+    def record(self, op):
+        if self._depth:
+            self._pending.append(op)
+        else:
+            self._commit([op])
+
+    @contextmanager
+    def group(self):
+        """ Record the operations of the block as a single entry """
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                ops, self._pending = self._pending, []
+                self._commit(ops)
+
+    @contextmanager
+    def replaying(self, target):
+        """ Record the operations of the block on the 'undo' or 'redo' stack """
+        previous, self._target = self._target, target
+        try:
+            yield
+        finally:
+            self._target = previous
+
+    def pop_undo(self):
+        return self._pop(self._undo)
+
+    def pop_redo(self):
+        return self._pop(self._redo)
+
+    def _pop(self, stack):
+        if not stack:
+            return None
+        ops, nbytes = stack.pop()
+        self._nbytes -= nbytes
+        return ops
+
+    def _commit(self, ops):
+        if not ops:
+            return
+        if self._target == "redo":
+            self._push(self._redo, ops)
+            return
+        if self._target is None and self._redo:
+            for _, nbytes in self._redo:
+                self._nbytes -= nbytes
+            self._redo.clear()
+        if self._target is None and self._merge_drag(ops):
+            return
+        self._push(self._undo, ops)
+        while self._nbytes > self.max_bytes and len(self._undo) > 1:
+            _, nbytes = self._undo.popleft()
+            self._nbytes -= nbytes
+
+    def _push(self, stack, ops):
+        nbytes = _nbytes(ops)
+        stack.append((ops, nbytes))
+        self._nbytes += nbytes
+
+    def _merge_drag(self, ops):
+        """
+        Fold the moves of a drag into the entry started by its first
+        position record, keeping the positions from before the drag.
+        """
+        if not self._undo or len(ops) != 1 or ops[0][0] != "move":
+            return False
+        last, nbytes = self._undo[-1]
+        if len(last) != 1 or last[0][0] != "move" or not last[0][4]:
+            return False
+        if list(last[0][1]) != list(ops[0][1]):
+            return False
+        kind, ids, x, y, _ = last[0]
+        self._undo[-1] = ([(kind, ids, x, y, ops[0][4])], nbytes)
+        return True
@@ -0,0 +1,229 @@
+"""
+Automatic layout of the nodes of a GraphStore. The algorithms work on the
+node and edge columns with NumPy and return new x and y arrays, writing them
+back is left to the caller (see ReactFlowEditor.layout).
+"""
+import numpy as np
+
+
+def _edges(store):
+    """ Source and target rows of the edges, without self loops """
+    sources = store.column("edges", "source")
+    targets = store.column("edges", "target")
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def _csr(rows, cols, n):
+    """ Compressed adjacency: cols of each row are cols[indptr[i]:indptr[i+1]] """
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def _gather(indptr, indices, rows):
+    """ Concatenated neighbours of the given rows """
+    starts, ends = indptr[rows], indptr[rows + 1]
+    counts = ends - starts
+    if not counts.sum():
+        return indices[:0]
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return indices[offsets + np.arange(counts.sum())]
+
+
+###############################################################################
+## Layered
+###############################################################################
+def layers(store):
+    """
+    Longest path layering: the layer of a node is the length of the longest
+    path reaching it. Cycles are broken at the node with the fewest
+    unprocessed predecessors.
+    """
+    n = store.n_nodes
+    sources, targets = _edges(store)
+    indptr, successors = _csr(sources, targets, n)
+    indegree = np.bincount(targets, minlength=n)
+    layer = np.full(n, -1, dtype=np.int64)
+    frontier = np.flatnonzero(indegree == 0)
+    depth = 0
+    while True:
+        if not len(frontier):
+            remaining = np.flatnonzero(layer < 0)
+            if not len(remaining):
+                break
+            frontier = remaining[[np.argmin(indegree[remaining])]]
+        layer[frontier] = depth
+        indegree[frontier] = -1
+        reached = _gather(indptr, successors, frontier)
+        np.subtract.at(indegree, reached, 1)
+        reached = np.unique(reached)
+        frontier = reached[indegree[reached] == 0]
+        depth += 1
+    return layer
+
+
+def _order(layer, sources, targets, sweeps):
+    """
+    Order the nodes within their layer by the barycenter of their
+    neighbours in the adjacent layers, alternating downward and upward
+    sweeps. Returns the position of each node in its layer.
+    """
+    n = len(layer)
+    forward = layer[sources] < layer[targets]
+    down = (sources[forward], targets[forward])
+    up = (targets[forward], sources[forward])
+    position = _rank(layer, np.arange(n, dtype=np.float64))
+    for sweep in range(sweeps):
+        neighbours, nodes = down if sweep % 2 == 0 else up
+        count = np.bincount(nodes, minlength=n)
+        total = np.bincount(nodes, weights=position[neighbours], minlength=n)
+        barycenter = np.where(count > 0, total / np.maximum(count, 1), position)
+        position = _rank(layer, barycenter)
+    return position
+
+
+def _rank(layer, key):
+    """ Rank of each node within its layer when sorted by key """
+    order = np.lexsort((key, layer))
+    sorted_layer = layer[order]
+    starts = np.flatnonzero(np.r_[True, sorted_layer[1:] != sorted_layer[:-1]])
+    first = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    rank = np.empty(len(layer), dtype=np.float64)
+    rank[order] = np.arange(len(order)) - first
+    return rank
+
+
+def layered_layout(store, layer_spacing=250., node_spacing=100.,
+                   direction="LR", sweeps=4):
+    """
+    Sugiyama style layout for directed acyclic graphs: nodes are assigned to
+    layers by longest path, ordered within their layer to reduce crossings
+    and centered. direction is 'LR' (layers from left to right) or 'TB'
+    (from top to bottom). Returns the x and y arrays of all nodes.
+    """
+    if direction not in ("LR", "TB"):
+        raise ValueError(f"Unknown direction {direction!r}, use 'LR' or 'TB'")
+    n = store.n_nodes
+    if not n:
+        return np.empty(0), np.empty(0)
+    layer = layers(store)
+    sources, targets = _edges(store)
+    position = _order(layer, sources, targets, sweeps)
+    size = np.bincount(layer)[layer]
+    across = (position - (size - 1) / 2) * node_spacing
+    along = layer * float(layer_spacing)
+    return (along, across) if direction == "LR" else (across, along)
+
+
+###############################################################################
+## Force directed
+###############################################################################
+def force_layout(store, iterations=50, k=150., seed=None, chunk_size=1024):
+    """
+    Fruchterman-Reingold layout: connected nodes attract, all nodes repel.
+    k is the ideal distance between connected nodes. Starts from the current
+    positions (nodes stacked on the same spot are spread randomly first) and
+    returns the x and y arrays of all nodes. Repulsion is computed in chunks
+    of chunk_size nodes to bound the memory use.
+    """
+    n = store.n_nodes
+    if not n:
+        return np.empty(0), np.empty(0)
+    rng = np.random.default_rng(seed)
+    pos = np.column_stack([store.column("nodes", "x"),
+                           store.column("nodes", "y")]).astype(np.float64)
+    _, inverse, counts = np.unique(pos, axis=0, return_inverse=True,
+                                   return_counts=True)
+    stacked = counts[inverse.ravel()] > 1
+    pos[stacked] += rng.uniform(-k, k, size=(int(stacked.sum()), 2)) * np.sqrt(n)
+    sources, targets = _edges(store)
+    temperature = k * np.sqrt(n)
+    for i in range(iterations):
+        displacement = np.empty_like(pos)
+        x, y = pos[:, 0], pos[:, 1]
+        for start in range(0, n, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            dx = x[chunk, None] - x
+            dy = y[chunk, None] - y
+            weight = dx * dx
+            weight += dy * dy
+            np.maximum(weight, 1e-2, out=weight)
+            np.divide(k ** 2, weight, out=weight)
+            displacement[chunk, 0] = np.einsum("ij,ij->i", dx, weight)
+            displacement[chunk, 1] = np.einsum("ij,ij->i", dy, weight)
+        delta = pos[sources] - pos[targets]
+        distance = np.sqrt((delta ** 2).sum(axis=-1))[:, None]
+        force = delta * distance / k
+        np.subtract.at(displacement, sources, force)
+        np.add.at(displacement, targets, force)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=-1)), 1e-9)
+        step = np.minimum(length, temperature * (1 - i / iterations))
+        pos += displacement * (step / length)[:, None]
+    pos -= pos.min(axis=0)
+    return pos[:, 0], pos[:, 1]
+
+
+###############################################################################
+## Incremental
+###############################################################################
+def place_nodes(store, ids, layer_spacing=250., node_spacing=100.):
+    """
+    Positions for the given nodes only, the other nodes are left in place.
+    A node is put to the right of its placed predecessors, else to the left
+    of its placed successors; nodes connected only to other new nodes follow
+    once those are placed. Unconnected nodes go below the graph. Nodes
+    landing on the same spot are stacked vertically. Returns the x and y
+    arrays of the given nodes.
+    """
+    rows = store.rows("nodes", ids)
+    x = store.column("nodes", "x").astype(np.float64)
+    y = store.column("nodes", "y").astype(np.float64)
+    placed = np.ones(store.n_nodes, dtype=bool)
+    placed[rows] = False
+    sources, targets = _edges(store)
+    while not placed[rows].all():
+        todo = ~placed
+        progress = np.zeros(store.n_nodes, dtype=bool)
+        for nodes, neighbours, offset, pick in (
+                (targets, sources, layer_spacing, np.maximum),
+                (sources, targets, -layer_spacing, np.minimum)):
+            mask = todo[nodes] & placed[neighbours] & ~progress[nodes]
+            nodes, neighbours = nodes[mask], neighbours[mask]
+            if not len(nodes):
+                continue
+            along = np.full(store.n_nodes, np.nan)
+            along[nodes] = x[neighbours]
+            pick.at(along, nodes, x[neighbours])
+            count = np.bincount(nodes, minlength=store.n_nodes)
+            total = np.bincount(nodes, weights=y[neighbours],
+                                minlength=store.n_nodes)
+            new = np.unique(nodes)
+            x[new] = along[new] + offset
+            y[new] = total[new] / count[new]
+            progress[new] = True
+        if not progress.any():
+            break
+        placed |= progress
+    isolated = rows[~placed[rows]]
+    if len(isolated):
+        anchored = placed.copy()
+        anchored[isolated] = False
+        left = x[anchored].min() if anchored.any() else 0.
+        bottom = y[anchored].max() + node_spacing if anchored.any() else 0.
+        x[isolated] = left
+        y[isolated] = bottom
+    _unstack(x, y, rows, node_spacing)
+    return x[rows], y[rows]
+
+
+def _unstack(x, y, rows, node_spacing):
+    """ Shift the given rows down until they do not share a spot """
+    occupied = np.ones(len(x), dtype=bool)
+    occupied[rows] = False
+    spots = set(zip(x[occupied].round().tolist(), y[occupied].round().tolist()))
+    for row in rows:
+        while (round(x[row]), round(y[row])) in spots:
+            y[row] += node_spacing
+        spots.add((round(x[row]), round(y[row])))
@@ -0,0 +1,174 @@
+"""
+Persistence of a GraphStore as a binary snapshot plus an append-only log of
+change records.
+
+A graph is saved in a directory holding one .npy file per column, strings
+as fixed width unicode and react_props as codes into the list of distinct
+props in meta.json, so a snapshot loads memory-mapped without parsing.
+Edits are appended to log.jsonl as React Flow change records, one batch per
+line, so saving an edit costs the size of the edit. Loading replays the log
+on top of the snapshot; compact writes a new snapshot and empties the log.
+"""
+import json
+import os
+from pathlib import Path
+import shutil
+
+import numpy as np
+
+from .store import GraphStore, NODE_COLUMNS, EDGE_COLUMNS
+
+FORMAT_VERSION = 1
+
+
+def save_snapshot(store, path):
+    """ Write the columns of a store to the directory path, replacing it """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    props, codes = [], {}
+    for table, spec in (("nodes", NODE_COLUMNS), ("edges", EDGE_COLUMNS)):
+        for name in spec:
+            column = store.column(table, name)
+            if name == "react_props":
+                column = _encode_props(column, props, codes)
+            elif column.dtype == object:
+                column = column.astype(str)
+            np.save(tmp / f"{table}-{name}.npy", column)
+    (tmp / "meta.json").write_text(json.dumps({
+        "version": FORMAT_VERSION,
+        "n_nodes": store.n_nodes,
+        "n_edges": store.n_edges,
+        "props": props,
+    }))
+    if path.exists():
+        old = path.with_name(path.name + ".old")
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, path)
+
+
+def _encode_props(column, distinct, codes):
+    """
+    Codes of the react_props into the list of distinct props, interned
+    props are shared so each dict object is serialized once.
+    """
+    by_object = {}
+    encoded = np.empty(len(column), dtype=np.int32)
+    for i, props in enumerate(column):
+        code = by_object.get(id(props))
+        if code is None:
+            key = json.dumps(props, sort_keys=True)
+            if key not in codes:
+                codes[key] = len(distinct)
+                distinct.append(props)
+            code = by_object[id(props)] = codes[key]
+        encoded[i] = code
+    return encoded
+
+
+def load_snapshot(path, mmap=True):
+    """
+    Load a snapshot directory as a GraphStore. With mmap, the numeric
+    columns are mapped copy-on-write: pages are read on access and edits
+    stay in memory.
+    """
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {meta['version']}")
+    columns = {}
+    for table, spec in (("nodes", NODE_COLUMNS), ("edges", EDGE_COLUMNS)):
+        columns[table] = {}
+        for name, dtype in spec.items():
+            column = np.load(path / f"{table}-{name}.npy",
+                             mmap_mode="c" if mmap and dtype is not object
+                             else None)
+            columns[table][name] = column.astype(object) \
+                if dtype is object and name != "react_props" else column
+    store = GraphStore.from_columns(columns["nodes"], columns["edges"])
+    props = np.empty(len(meta["props"]), dtype=object)
+    props[:] = [store.intern_props(p) for p in meta["props"]]
+    for table in ("nodes", "edges"):
+        codes = store._columns[table]["react_props"]
+        store._columns[table]["react_props"] = props[codes]
+    return store
+
+
+class GraphLog:
+    """
+    A snapshot directory with its append-only change log.
+
+    >>> log = GraphLog("graph")
+    >>> log.save(store)  # full snapshot, empties the log
+    >>> log.append(nodes=[{"type": "position", "id": "a", ...}])
+    >>> store = log.load()  # snapshot + replayed log
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+
+    @property
+    def log_path(self):
+        return self.path / "log.jsonl"
+
+    @property
+    def exists(self):
+        return (self.path / "meta.json").exists()
+
+    def save(self, store):
+        """ Write a snapshot of the store and start an empty log """
+        self.close()
+        save_snapshot(store, self.path)
+        self.log_path.touch()
+
+    compact = save
+
+    def append(self, nodes=(), edges=()):
+        """ Append a batch of node and edge change records """
+        if not nodes and not edges:
+            return
+        if self._file is None:
+            self._file = open(self.log_path, "a", encoding="utf-8")
+        self._file.write(json.dumps(
+            {"nodes": list(nodes), "edges": list(edges)}, default=_default))
+        self._file.write("\n")
+        self._file.flush()
+
+    @property
+    def log_bytes(self):
+        """ Size of the log, e.g. to decide when to compact """
+        return self.log_path.stat().st_size if self.log_path.exists() else 0
+
+    def load(self, mmap=True):
+        """ Load the snapshot and replay the log """
+        store = load_snapshot(self.path, mmap=mmap)
+        if self.log_path.exists():
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        batch = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a write interrupted while appending the last batch
+                        break
+                    store.apply_records("nodes", batch["nodes"])
+                    store.apply_records("edges", batch["edges"])
+        return store
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _default(obj):
+    """ json fallback for the NumPy scalars found in records """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
@@ -1,11 +1,13 @@
 import {
+  createContext,
   useCallback,
+  useContext,
   useState,
   useRef,
   useEffect,
   useMemo,
 } from 'react';
-import { 
+import {
   ReactFlow,
   ReactFlowProvider,
   Controls,
@@ -14,17 +16,39 @@ import {
   MarkerType,
   Handle,
   Position,
-  // applyNodeChanges,
-  // applyEdgeChanges,
+  applyNodeChanges,
+  applyEdgeChanges,
   addEdge,
   useNodesState,
   useEdgesState,
+  useStore,
+  useReactFlow,
 } from '@xyflow/react';
 
 
+// Shared with the nodes when panes are mounted lazily, nodes register
+// themselves while they are rendered in detail.
+const LazyPaneContext = createContext({ enabled: false });
+
+const zoomSelector = (s) => s.transform[2];
+
 // 1. Create the CustomNode component
 // This component will receive the rendered Panel child via props.data.panel_child
-function CustomNode({ data }) {
+function CustomNode({ id, data }) {
+  const lazy = useContext(LazyPaneContext);
+  const zoom = useStore(zoomSelector);
+  const detailed = !lazy.enabled || zoom >= lazy.minZoom;
+
+  useEffect(() => {
+    if (!lazy.enabled || !detailed || !data.has_pane) return;
+    lazy.mount(id);
+    return () => lazy.unmount(id);
+  }, [id, lazy, detailed, data.has_pane]);
+
+  let pane = data.pane_component;
+  if (lazy.enabled && data.has_pane && (!detailed || !pane)) {
+    pane = <div className="reactflow-pane-placeholder" style={{ minHeight: '40px' }} />;
+  }
   return (
     <>
       <Handle type="target" position={Position.Left} />
@@ -33,88 +57,386 @@ function CustomNode({ data }) {
         minWidth: '150px',
       }}>
         <h3>{data.label}</h3>
-        {data.pane_component}
+        {pane}
       </div>
       <Handle type="source" position={Position.Right} />
     </>
   );
 }
 
+// Change types that are exchanged with python, the rest (e.g. dimensions)
+// only matter to the browser.
+const SYNCED_CHANGES = new Set(['position', 'select', 'remove', 'add', 'replace']);
+
+// Strip the rendered pane from a node so it can be serialized
+function serializeNode({ data, ...rest }) {
+  const { pane_component, ...serializableData } = data || {};
+  return { ...rest, data: serializableData };
+}
+
+// Edge weights are sent as numbers in the edge data, the label showing them
+// is only formatted here
+function formatWeight(weight) {
+  return `${(weight * 100).toFixed(2)}%`;
+}
+
+// Shared default props are only sent once, merge them into each element
+function withDefaults(element, defaults) {
+  return defaults ? { ...defaults, ...element } : element;
+}
+
+function sameValue(a, b) {
+  return a === b || (typeof a === 'object' && a !== null
+    && JSON.stringify(a) === JSON.stringify(b));
+}
+
+// Drop the props equal to the defaults before sending an element to python
+function stripDefaults(element, defaults) {
+  if (!defaults) return element;
+  const result = {};
+  for (const [key, value] of Object.entries(element)) {
+    if (!(key in defaults) || !sameValue(defaults[key], value)) result[key] = value;
+  }
+  return result;
+}
+
+// Emphasize the highlighted elements and dim the others, only the class
+// names shown on the canvas change
+function withHighlight(element, highlighted) {
+  const name = highlighted.has(element.id) ? 'reactflow-highlight' : 'reactflow-dimmed';
+  return {
+    ...element,
+    className: element.className ? `${element.className} ${name}` : name,
+  };
+}
+
+// Fits the viewport on request from python, it has to be rendered inside
+// ReactFlow to reach its instance
+function ViewController({ model }) {
+  const { fitView } = useReactFlow();
+  useEffect(() => {
+    const onMsg = (msg) => {
+      if (msg.type !== 'fit_view') return;
+      fitView({
+        nodes: msg.nodes ? msg.nodes.map((id) => ({ id })) : undefined,
+        padding: msg.padding,
+        duration: msg.duration,
+      });
+    };
+    model.on('msg:custom', onMsg);
+    return () => model.off('msg:custom', onMsg);
+  }, [fitView]);
+  return null;
+}
+
+// Reduce a NodeChange/EdgeChange to the fields python needs. Intermediate
+// drag positions are skipped, only the final position is sent.
+function serializeChanges(changes, serializeItem) {
+  const result = [];
+  for (const change of changes) {
+    if (!SYNCED_CHANGES.has(change.type)) continue;
+    switch (change.type) {
+      case 'position':
+        if (change.dragging || !change.position) continue;
+        result.push({ type: 'position', id: change.id, position: change.position });
+        break;
+      case 'select':
+        result.push({ type: 'select', id: change.id, selected: change.selected });
+        break;
+      case 'remove':
+        result.push({ type: 'remove', id: change.id });
+        break;
+      default:
+        result.push({ ...change, item: serializeItem(change.item) });
+    }
+  }
+  return result;
+}
+
+// Keep only the last position/select/replace record of each element
+function coalesceChanges(changes) {
+  const seen = new Set();
+  const result = [];
+  for (let i = changes.length - 1; i >= 0; i--) {
+    const change = changes[i];
+    if (['position', 'select', 'replace'].includes(change.type)) {
+      const key = `${change.type}:${change.id}`;
+      if (seen.has(key)) continue;
+      seen.add(key);
+    }
+    result.push(change);
+  }
+  return result.reverse();
+}
+
+// Schedule a callback according to the sync policy, returns a canceller
+function scheduleSync(policy, interval, callback) {
+  if (policy === 'idle' && window.requestIdleCallback) {
+    const handle = window.requestIdleCallback(callback, { timeout: interval });
+    return () => window.cancelIdleCallback(handle);
+  }
+  const handle = setTimeout(callback, interval);
+  return () => clearTimeout(handle);
+}
+
 export function render({ model }) {
 
   const nodeTypes = useMemo(() => ({ custom: CustomNode }), []);
 
   const node_panes = model.get_child('panel_nodes');
-  const [py_nodes, setPyNodes] = model.useState('reactflow_nodes');
-  const [py_edges, setPyEdges] = model.useState('edges');
+  const [pane_ids] = model.useState('pane_ids');
+  const [py_nodes] = model.useState('reactflow_nodes');
+  const [py_edges] = model.useState('edges');
   const [defaultEdgeOptions] = model.useState('default_edge_options');
+  const [defaultNodeOptions] = model.useState('default_node_options');
+  const [lazyPanes] = model.useState('lazy_panes');
+  const [lazyMinZoom] = model.useState('lazy_min_zoom');
 
-  const processed_nodes = useMemo(() =>
-    py_nodes.map(node => ({
-      ...node,
-      data: {
-        ...node.data,
-        pane_component: node_panes[node.data.pane_index],
-      },
-    })), [py_nodes, node_panes]);
+  // nodes currently rendered in detail, reported to python in batches so it
+  // can mount and evict panes
+  const visibleRef = useRef(new Set());
+  const visibleTimer = useRef(null);
+  const reportVisible = useCallback(() => {
+    if (visibleTimer.current) return;
+    visibleTimer.current = setTimeout(() => {
+      visibleTimer.current = null;
+      model.send_msg({ type: 'viewport', visible: [...visibleRef.current] });
+    }, 100);
+  }, []);
+  const lazyContext = useMemo(() => ({
+    enabled: lazyPanes,
+    minZoom: lazyMinZoom,
+    mount: (id) => { visibleRef.current.add(id); reportVisible(); },
+    unmount: (id) => { visibleRef.current.delete(id); reportVisible(); },
+  }), [lazyPanes, lazyMinZoom, reportVisible]);
+
+  // panes keyed by node id, so reordering or removing nodes does not move
+  // panes between nodes
+  const paneMapRef = useRef({});
+  const paneMap = useMemo(() => {
+    // the children and their ids may arrive in separate updates
+    if (pane_ids.length !== node_panes.length) return paneMapRef.current;
+    const map = {};
+    pane_ids.forEach((id, i) => { map[id] = node_panes[i]; });
+    paneMapRef.current = map;
+    return map;
+  }, [pane_ids, node_panes]);
 
-  // const [nodes, setNodes, onNodesChange] = useNodesState(py_nodes);
-  const [nodes, setNodes, onNodesChange] = useNodesState(processed_nodes);
-  const [edges, setEdges, onEdgesChange] = useEdgesState(py_edges);
+  // reads the latest panes through the ref so that it stays stable and a
+  // pane change does not trigger a full replacement, see below
+  const attachPane = useCallback((node) => ({
+    ...node,
+    data: {
+      ...node.data,
+      pane_component: paneMapRef.current[node.id],
+    },
+  }), []);
 
-  // ref for latest nodes and edges
-  const nodesRef = useRef(nodes);
+  // nodes and edges from python, completed with the shared defaults
+  const prepareNode = useCallback((node) => (
+    attachPane(withDefaults(node, defaultNodeOptions))
+  ), [attachPane, defaultNodeOptions]);
+  const prepareEdge = useCallback((edge) => {
+    const prepared = withDefaults(edge, defaultEdgeOptions);
+    const weight = prepared.data?.weight;
+    if (weight == null || prepared.label != null) return prepared;
+    return { ...prepared, label: formatWeight(weight) };
+  }, [defaultEdgeOptions]);
+
+  const [nodes, setNodes, onNodesChange] = useNodesState(py_nodes.map(prepareNode));
+  const [edges, setEdges, onEdgesChange] = useEdgesState(py_edges.map(prepareEdge));
+
+  // highlighted elements, the class names are only added to the elements
+  // passed to ReactFlow so the state synced with python is untouched
+  const [highlighted] = model.useState('highlighted');
+  const highlight = useMemo(() => ({
+    active: highlighted.nodes.length + highlighted.edges.length > 0,
+    nodes: new Set(highlighted.nodes),
+    edges: new Set(highlighted.edges),
+  }), [highlighted]);
+  const shownNodes = useMemo(() => (highlight.active
+    ? nodes.map((node) => withHighlight(node, highlight.nodes)) : nodes
+  ), [nodes, highlight]);
+  const shownEdges = useMemo(() => (highlight.active
+    ? edges.map((edge) => withHighlight(edge, highlight.edges)) : edges
+  ), [edges, highlight]);
+
+  // ref for latest edges
   const edgesRef = useRef(edges);
 
   // sync current value
-  useEffect(() => { nodesRef.current = nodes; }, [nodes]);
   useEffect(() => { edgesRef.current = edges; }, [edges]);
 
-  // sync changes from python to local
-  useEffect(() => { setNodes(processed_nodes); }, [processed_nodes, setNodes]);
-  useEffect(() => { setEdges(py_edges); }, [py_edges, setEdges]);
-
-  // Sync change from local to python
-  const syncToPython = useCallback(() => {
-    const nodesToSync = nodesRef.current.map(({ data, ...rest }) => {
-      const { pane_component, ...serializableData } = data;
-      return { ...rest, data: serializableData };
-    });
-    // setPyNodes(nodesRef.current);
-    setPyNodes(nodesToSync);
-    setPyEdges(edgesRef.current);
-  }, [setPyNodes, setPyEdges]);
+  // full state replacement from python, also when the defaults change
+  useEffect(() => { setNodes(py_nodes.map(prepareNode)); }, [py_nodes, prepareNode, setNodes]);
+  useEffect(() => { setEdges(py_edges.map(prepareEdge)); }, [py_edges, prepareEdge, setEdges]);
+
+  // re-attach panes when the panel children change, only nodes whose pane
+  // model changed are touched
+  useEffect(() => {
+    setNodes((nds) => nds.map((node) => (
+      node.data?.pane_component?.props.id === paneMap[node.id]?.props.id
+        ? node : attachPane(node)
+    )));
+  }, [paneMap, attachPane, setNodes]);
+
+  // incremental changes from python
+  useEffect(() => {
+    const onMsg = (msg) => {
+      if (msg.type !== 'changes') return;
+      if (msg.nodes.length) {
+        const changes = msg.nodes.map((change) => (
+          change.item ? { ...change, item: prepareNode(change.item) } : change
+        ));
+        setNodes((nds) => applyNodeChanges(changes, nds));
+      }
+      if (msg.edges.length) {
+        const changes = msg.edges.map((change) => (
+          change.item ? { ...change, item: prepareEdge(change.item) } : change
+        ));
+        setEdges((eds) => applyEdgeChanges(changes, eds));
+      }
+    };
+    model.on('msg:custom', onMsg);
+    return () => model.off('msg:custom', onMsg);
+  }, [prepareNode, prepareEdge, setNodes, setEdges]);
+
+  // Sync change from local to python, only the change records are sent.
+  // Records are queued and flushed according to the sync policy.
+  const [syncPolicy] = model.useState('sync_policy');
+  const [syncInterval] = model.useState('sync_interval');
+  const [dragInterval] = model.useState('drag_interval');
+  const [telemetry] = model.useState('telemetry');
+  const pending = useRef({ nodes: [], edges: [] });
+  const cancelFlush = useRef(null);
+  const lastDrag = useRef(0);
+  // browser side timings of the queued records, sent along when telemetry
+  // is enabled
+  const stamps = useRef({ queuedAt: null, serializeMs: 0 });
+
+  const stamp = useCallback((message) => {
+    if (!telemetry) return message;
+    const { queuedAt, serializeMs } = stamps.current;
+    const now = Date.now();
+    stamps.current = { queuedAt: null, serializeMs: 0 };
+    return {
+      ...message,
+      telemetry: {
+        sent_at: now,
+        queued_ms: queuedAt == null ? 0 : now - queuedAt,
+        serialize_ms: serializeMs,
+      },
+    };
+  }, [telemetry]);
+
+  const flush = useCallback(() => {
+    if (cancelFlush.current) {
+      cancelFlush.current();
+      cancelFlush.current = null;
+    }
+    const { nodes: nodeChanges, edges: edgeChanges } = pending.current;
+    if (!nodeChanges.length && !edgeChanges.length) return;
+    pending.current = { nodes: [], edges: [] };
+    model.send_msg(stamp({
+      type: 'changes',
+      nodes: coalesceChanges(nodeChanges),
+      edges: coalesceChanges(edgeChanges),
+    }));
+  }, [stamp]);
+
+  // flush whatever is queued when the component goes away
+  useEffect(() => flush, [flush]);
+
+  const sendChanges = useCallback((nodeChanges, edgeChanges) => {
+    if (!nodeChanges.length && !edgeChanges.length) return;
+    if (telemetry && stamps.current.queuedAt == null) {
+      stamps.current.queuedAt = Date.now();
+    }
+    pending.current.nodes.push(...nodeChanges);
+    pending.current.edges.push(...edgeChanges);
+    const structural = [...nodeChanges, ...edgeChanges].some(
+      (change) => change.type === 'add' || change.type === 'remove');
+    if (structural || syncPolicy === 'immediate') {
+      flush();
+    } else if (syncPolicy === 'debounce') {
+      if (cancelFlush.current) cancelFlush.current();
+      cancelFlush.current = scheduleSync(syncPolicy, syncInterval, flush);
+    } else if (!cancelFlush.current) {
+      cancelFlush.current = scheduleSync(syncPolicy, syncInterval, flush);
+    }
+  }, [syncPolicy, syncInterval, flush, telemetry]);
+
+  // live positions while dragging, capped at one message per drag_interval
+  const sendDragPositions = useCallback((changes) => {
+    if (dragInterval == null) return;
+    const now = Date.now();
+    if (now - lastDrag.current < dragInterval) return;
+    const positions = changes
+      .filter((change) => change.type === 'position' && change.dragging && change.position)
+      .map(({ id, position }) => ({ type: 'position', id, position, dragging: true }));
+    if (!positions.length) return;
+    lastDrag.current = now;
+    const message = { type: 'changes', nodes: positions, edges: [] };
+    model.send_msg(telemetry
+      ? { ...message, telemetry: { sent_at: now, queued_ms: 0, serialize_ms: 0 } }
+      : message);
+  }, [dragInterval, telemetry]);
+
+  // serialize the records, timed when telemetry is enabled
+  const serialize = useCallback((changes, serializeItem) => {
+    if (!telemetry) return serializeChanges(changes, serializeItem);
+    const start = performance.now();
+    const result = serializeChanges(changes, serializeItem);
+    stamps.current.serializeMs += performance.now() - start;
+    return result;
+  }, [telemetry]);
+
+  const handleNodesChange = useCallback((changes) => {
+    onNodesChange(changes);
+    sendDragPositions(changes);
+    sendChanges(serialize(changes, (node) => (
+      stripDefaults(serializeNode(node), defaultNodeOptions))), []);
+  }, [onNodesChange, sendChanges, sendDragPositions, serialize, defaultNodeOptions]);
+
+  const handleEdgesChange = useCallback((changes) => {
+    onEdgesChange(changes);
+    sendChanges([], serialize(changes, (edge) => (
+      stripDefaults(edge, defaultEdgeOptions))));
+  }, [onEdgesChange, sendChanges, serialize, defaultEdgeOptions]);
 
   // onConnect needs to be handled specially as it modifies state directly
   const onConnect = useCallback((connection) => {
-    const newEdges = addEdge(connection, edgesRef.current);
+    const current = edgesRef.current;
+    const newEdges = addEdge(prepareEdge(connection), current);
+    if (newEdges.length === current.length) return;
     setEdges(newEdges);
-    setPyEdges(newEdges);
-  }, [setEdges, setPyEdges]);
+    const item = newEdges[newEdges.length - 1];
+    sendChanges([], [{ type: 'add', item: stripDefaults(item, defaultEdgeOptions) }]);
+  }, [setEdges, sendChanges, prepareEdge, defaultEdgeOptions]);
 
   // Render the external React component with props
   return (
     <div style={{ width: '100%', height: '100%' }}>
       <ReactFlowProvider>
-        <ReactFlow 
-          nodes={nodes}
-          edges={edges}
+        <LazyPaneContext.Provider value={lazyContext}>
+        <ReactFlow
+          nodes={shownNodes}
+          edges={shownEdges}
           defaultEdgeOptions={defaultEdgeOptions}
           nodeTypes={nodeTypes}
+          onlyRenderVisibleElements={lazyPanes}
 
-          // Local state
-          onNodesChange={onNodesChange}
-          onEdgesChange={onEdgesChange}
-
-          // Sync state
-          onNodeDragStop={syncToPython}
-          onSelectionChange={syncToPython}
+          // Local state, forwarded to python as change records
+          onNodesChange={handleNodesChange}
+          onEdgesChange={handleEdgesChange}
           onConnect={onConnect}
         >
+          <ViewController model={model} />
           <Controls />
           <MiniMap />
           <Background />
         </ReactFlow>
+        </LazyPaneContext.Provider>
       </ReactFlowProvider>
     </div>
   );
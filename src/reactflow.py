@@ -1,21 +1,178 @@
-from pprint import pprint
-
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field as dc_field
+from functools import partial, wraps
 from pathlib import Path
+import json
+import logging
+import threading
+import time
 import uuid
 
-import pandas as pd
+import numpy as np
 
 import panel as pn
 import param
 import panel.custom
 import panel.viewable
 import panel.reactive
+from panel.io.state import set_curdoc
+
+from .store import GraphStore, NODE_COLUMNS
+from .layout import layered_layout, force_layout, place_nodes
+from .history import History
+from .persist import GraphLog
+from .groups import NodeGroups, GROUP_PREFIX, aggregate_positions
+from .search import SearchIndex, tokenize
+from .analytics import GraphAnalytics
+
+logger = logging.getLogger(__name__)
+
+# assets written by `python -m src.build`, when present they are served from
+# the module instead of being fetched from esm.sh and jsdelivr
+_DIST = Path(__file__).parent / "dist"
+_BUNDLE = _DIST / "reactflow.bundle.js"
+_CSS = _DIST / "xyflow.css"
+
+# inline icons, so the tables do not need an icon font from a CDN
+_ICONS = {
+    "trash": (
+        '<svg width="14" height="14" viewBox="0 0 24 24" fill="none" '
+        'stroke="currentColor" stroke-width="2"><path d="M3 6h18M8 6V4h8v2'
+        'M19 6l-1 14H6L5 6M10 11v6M14 11v6"/></svg>'),
+    "plus": (
+        '<svg width="14" height="14" viewBox="0 0 24 24" fill="none" '
+        'stroke="currentColor" stroke-width="2"><path d="M12 5v14M5 12h14"/>'
+        '</svg>'),
+}
+
+# classes set by the browser on highlighted and dimmed elements
+_HIGHLIGHT_CSS = """
+.react-flow__node.reactflow-dimmed, .react-flow__edge.reactflow-dimmed {
+  opacity: 0.25;
+}
+.react-flow__node.reactflow-highlight {
+  box-shadow: 0 0 0 3px #f59e0b;
+}
+.react-flow__edge.reactflow-highlight .react-flow__edge-path {
+  stroke: #f59e0b;
+  stroke-width: 3;
+}
+"""
+
+_extension_loaded = False
+
+
+def extension(*args, **kwargs):
+    """
+    Load the Panel extensions used by the editor (tabulator), with any
+    further pn.extension arguments. Importing this module has no side
+    effects; ReactFlowEditor calls this on first use, call it explicitly to
+    pass arguments or to load the resources up front in a notebook.
+    """
+    global _extension_loaded
+    pn.extension("tabulator", *args, **kwargs)
+    _extension_loaded = True
 
-pn.extension(
-    "tabulator",
-    css_files=[
-        "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css"],
-)
+
+_executor = None
+
+
+def _worker_pool():
+    """ Threads shared by the editors processing their events off the loop """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(thread_name_prefix="reactflow")
+    return _executor
+
+
+def _on_document(doc, callback):
+    """ Run the callback on the thread and event loop of a document """
+    if doc is None or doc.session_context is None or doc is pn.state.curdoc:
+        callback()
+        return
+
+    def run():
+        with set_curdoc(doc):
+            callback()
+    doc.add_next_tick_callback(run)
+
+
+def _locked(method):
+    """ Run an editor method holding its lock, so that it never runs
+    concurrently with the events processed on the worker thread """
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+@dataclass
+class GraphChange:
+    """
+    A batch of React Flow change records, see
+    https://reactflow.dev/api-reference/types/node-change and
+    https://reactflow.dev/api-reference/types/edge-change.
+    Only 'position', 'select', 'remove', 'add' and 'replace' changes are
+    exchanged with python.
+    """
+    nodes: list = dc_field(default_factory=list)
+    edges: list = dc_field(default_factory=list)
+
+
+@dataclass
+class SyncEvent:
+    """
+    Timing of one step of the sync between the browser and python, reported
+    when telemetry is enabled. `stage` is one of:
+
+    * 'receive': handling change records sent by the browser, including the
+      on_change callbacks
+    * 'send': change records sent to the browser
+    * 'replace': the full node list replaced
+    * 'editor.apply': the editor applying the records of the browser
+    * 'editor.table': the editor patching a table
+    * 'editor.full': the editor rebuilding the canvas and the tables
+
+    `client` holds the stamps of the browser for received records:
+    'serialize_ms' spent serializing them, 'queued_ms' they waited for the
+    sync policy and 'transfer_ms' between sending and receiving them (the
+    latter compares the clocks of the browser and the server).
+    """
+    stage: str
+    duration: float
+    payload_bytes: int = 0
+    n_nodes: int = 0
+    n_edges: int = 0
+    client: dict = dc_field(default_factory=dict)
+
+
+def coalesce_changes(changes):
+    """
+    Drop change records superseded by a later record of the same type for
+    the same element, e.g. the intermediate positions of a node moved several
+    times. Additions and removals are always kept.
+    """
+    seen = set()
+    coalesced = []
+    for change in reversed(changes):
+        if change["type"] in ("position", "select", "replace"):
+            key = (change["type"], change["id"])
+            if key in seen:
+                continue
+            seen.add(key)
+        coalesced.append(change)
+    return coalesced[::-1]
+
+
+def strip_defaults(element, defaults):
+    """ Drop the keys of an element equal to the shared defaults """
+    if not defaults or not any(k in element for k in defaults):
+        return element
+    return {k: v for k, v in element.items()
+            if k not in defaults or defaults[k] != v}
 
 
 class ReactFlowComponent(pn.custom.ReactComponent):
@@ -24,69 +181,615 @@ class ReactFlowComponent(pn.custom.ReactComponent):
     edges = param.List(default=[], doc="ReactFlow edges")
     reactflow_nodes = param.List(default=[])
     panel_nodes = pn.custom.Children()
+    pane_ids = param.List(default=[], doc="""
+        Ids of the nodes the panel_nodes belong to, in the same order.""")
 
     default_edge_options = param.Dict(
         doc="https://reactflow.dev/api-reference/types/default-edge-options")
+    default_node_options = param.Dict(default={}, doc="""
+        Props shared by all nodes, e.g. sourcePosition and targetPosition.
+        Like default_edge_options, node keys equal to these defaults are not
+        sent to the browser, which merges the defaults back in.""")
+
+    lazy_panes = param.Boolean(default=False, doc="""
+        Only create and render the pane of a node once the node is in the
+        viewport, off-screen nodes render a lightweight placeholder.""")
+    lazy_min_zoom = param.Number(default=0.3, bounds=(0, None), doc="""
+        With lazy_panes, below this zoom level nodes render the placeholder
+        instead of their pane.""")
+    max_panes = param.Integer(default=None, bounds=(0, None), doc="""
+        With lazy_panes, the number of panes kept mounted. Above it, the panes
+        that have been off-screen the longest are evicted.""")
+    pane_eviction_delay = param.Number(default=10, bounds=(0, None), doc="""
+        Seconds a pane has to be off-screen before it can be evicted.""")
+
+    sync_policy = param.Selector(
+        default="immediate", objects=["immediate", "debounce", "throttle", "idle"],
+        doc="""
+        How changes made in the browser are sent to python: immediately,
+        once no change happened for sync_interval ms (debounce), at most
+        every sync_interval ms (throttle) or when the browser is idle but at
+        the latest after sync_interval ms (idle). Queued changes are coalesced
+        and additions or removals always flush the queue immediately.""")
+    sync_interval = param.Integer(default=200, bounds=(0, None), doc="""
+        Milliseconds used by the debounce, throttle and idle sync policies.""")
+    drag_interval = param.Integer(default=None, bounds=(0, None), doc="""
+        If set, the positions of dragged nodes are also sent while dragging,
+        at most every drag_interval ms. These position records carry
+        'dragging': True.""")
+
+    highlighted = param.Dict(default={"nodes": [], "edges": []}, doc="""
+        Ids of the nodes and edges emphasized on the canvas, the other
+        elements are dimmed while any is set. Only the ids are sent to the
+        browser, see highlight.""")
+
+    telemetry = param.Boolean(default=False, doc="""
+        Record the timings, payload sizes and element counts of the sync as
+        SyncEvents, passed to the on_telemetry callbacks and logged at debug
+        level. The browser stamps the change records it sends as well.""")
 
     _importmap = {"imports": {"@xyflow/react": "https://esm.sh/@xyflow/react"}}
     _esm = Path(__file__).parent / "reactflow.js"
+    _bundle = _BUNDLE if _BUNDLE.is_file() else None
     _stylesheets = [
-        "https://cdn.jsdelivr.net/npm/@xyflow/react/dist/style.css"]
+        "dist/xyflow.css" if _CSS.is_file() else
+        "https://cdn.jsdelivr.net/npm/@xyflow/react/dist/style.css",
+        _HIGHLIGHT_CSS]
 
     def __init__(self, **params):
         """
         Nodes are passed as a list of dictionaries. The dictionary mimics the 
         reactlfow.dev api https://reactflow.dev/api-reference.
         A special keyword is introduced which is 'panes' for each node and this
-        contains a single viewable that can be presented as the node itself.
+        contains a single viewable that can be presented as the node itself,
+        or a callable returning one which is only called once the pane is
+        needed.
+        Panes are keyed by node id, so adding, removing or reordering nodes
+        only mounts or unmounts the panes of the affected nodes.
         """
         # Check if the user provided our new convenience parameter
         nodes = params.pop("nodes", [])
-        reactflow_nodes, panel_nodes = self._process_nodes(nodes)
+        reactflow_nodes, sources = self._process_nodes(nodes)
+        panes = {} if params.get("lazy_panes") else self._materialize(sources)
         params["reactflow_nodes"] = reactflow_nodes
-        params["panel_nodes"] = panel_nodes
+        params["panel_nodes"] = list(panes.values())
+        params["pane_ids"] = list(panes)
         super().__init__(**params)
+        self._pane_sources = sources
+        self._panes = panes
+        self._pane_seen = {}
+        self._visible = set()
+        self._change_callbacks = []
+        self._telemetry_callbacks = []
+        self._indices = {}
+        self._log = None
+        self._shared = None
+        self._selection = {"nodes": set(), "edges": set()}
 
     @property
     def nodes(self):
         return [{
             **n,
-            "panel": self.reactflow_nodes[i]
-        } for i, n in enumerate(self.nodes)]
+            "panes": self._panes.get(n["id"], self._pane_sources.get(n["id"]))
+        } for n in self.reactflow_nodes]
 
     @nodes.setter
     def nodes(self, value):
-        reactflow_nodes, panel_nodes = self._process_nodes(nodes)
-        self.reactflow_nodes = reactflow_nodes
-        self.panel_nodes = panel_nodes
+        if self._shared is not None:
+            self._shared.nodes = value
+            return
+        with self._measure("replace") as event:
+            reactflow_nodes, sources = self._process_nodes(value)
+            self._pane_sources = sources
+            self._panes = self._materialize({
+                id_: pane for id_, pane in sources.items()
+                if not self.lazy_panes or id_ in self._visible
+            })
+            self.param.update(reactflow_nodes=reactflow_nodes,
+                              panel_nodes=list(self._panes.values()),
+                              pane_ids=list(self._panes))
+            if event is not None:
+                event.n_nodes = len(reactflow_nodes)
+                event.payload_bytes = _payload_size(reactflow_nodes)
 
     def _process_nodes(self, nodes):
 
         reactflow_nodes = []
-        panel_nodes = []
+        panes = {}
 
         # Perform the separation logic
-        for i, n in enumerate(nodes):
+        for n in nodes:
             pane = n.pop("panes", None)
-            panel_nodes.append(pane)
+            if pane is not None:
+                panes[n["id"]] = pane
+            reactflow_nodes.append(self._process_node(n, pane is not None))
+
+        return reactflow_nodes, panes
 
-            # Add required keys for the React component
-            n["type"] = "custom"
-            if "data" in n:
-                n["data"]["pane_index"] = i
+    @staticmethod
+    def _process_node(n, has_pane=False):
+        """ Add required keys for the React component """
+        n["type"] = "custom"
+        if has_pane:
+            n["data"] = {**n.get("data", {}), "has_pane": True}
+        return n
+
+    @staticmethod
+    def _materialize(sources):
+        """ Call the pane factories """
+        return {
+            id_: pane() if callable(pane) and
+            not isinstance(pane, panel.viewable.Viewable) else pane
+            for id_, pane in sources.items()
+        }
+
+    def _update_panes(self, added=None, removed=()):
+        """
+        Attach and detach panes by node id. Panes of other nodes stay in
+        place so their models are not re-rendered.
+        """
+        removed = [id_ for id_ in removed if id_ in self._panes]
+        if not added and not removed:
+            return
+        panes = dict(self._panes)
+        for id_ in removed:
+            del panes[id_]
+        panes.update(added or {})
+        self._panes = panes
+        self.param.update(panel_nodes=list(panes.values()),
+                          pane_ids=list(panes))
+
+    def _update_pane_sources(self, added=None, removed=()):
+        """ Register or drop the panes of added and removed nodes """
+        added = added or {}
+        for id_ in removed:
+            self._pane_sources.pop(id_, None)
+            self._pane_seen.pop(id_, None)
+        self._pane_sources.update(added)
+        self._update_panes(self._materialize({
+            id_: pane for id_, pane in added.items()
+            if not self.lazy_panes or id_ in self._visible
+        }), removed)
+
+    ###########################################################################
+    ## Lazy panes
+    ###########################################################################
+    def _update_viewport(self, visible):
+        """
+        Mount the panes of the nodes reported visible by the browser and,
+        above max_panes, evict the panes off-screen for the longest time.
+        """
+        now = time.monotonic()
+        # the nodes leaving the viewport were seen until now, the eviction
+        # delay counts from then
+        for id_ in self._visible - set(visible):
+            self._pane_seen[id_] = now
+        self._visible = set(visible)
+        for id_ in self._visible:
+            self._pane_seen[id_] = now
+        if not self.lazy_panes:
+            return
+        added = self._materialize({
+            id_: self._pane_sources[id_] for id_ in visible
+            if id_ in self._pane_sources and id_ not in self._panes
+        })
+        removed = []
+        if self.max_panes is not None:
+            excess = len(self._panes) + len(added) - self.max_panes
+            if excess > 0:
+                candidates = sorted(
+                    (id_ for id_ in self._panes if id_ not in self._visible
+                     and now - self._pane_seen.get(id_, 0) >=
+                     self.pane_eviction_delay),
+                    key=lambda id_: self._pane_seen.get(id_, 0))
+                removed = candidates[:excess]
+        self._update_panes(added, removed)
+
+    @param.depends("lazy_panes", watch=True)
+    def _mount_all_panes(self):
+        if not self.lazy_panes:
+            self._update_panes(self._materialize({
+                id_: pane for id_, pane in self._pane_sources.items()
+                if id_ not in self._panes
+            }))
+
+    @property
+    def selection(self):
+        """
+        Ids of the selected nodes and edges. Components attached to a
+        SharedGraph keep their own selection.
+        """
+        if self._shared is not None:
+            return {field: sorted(ids) for field, ids in self._selection.items()}
+        return {
+            "nodes": [n["id"] for n in self.reactflow_nodes if n.get("selected")],
+            "edges": [e["id"] for e in self.edges if e.get("selected")],
+        }
+
+    ###########################################################################
+    ## Shared graph
+    ###########################################################################
+    def _attach_shared(self, shared):
+        self._shared = shared
+        master = shared._master
+        self._selection = {
+            "nodes": {n["id"] for n in master.reactflow_nodes if n.get("selected")},
+            "edges": {e["id"] for e in master.edges if e.get("selected")},
+        }
+        self._sync_shared()
+
+    def _detach_shared(self):
+        self._shared = None
+        self._pane_sources = dict(self._pane_sources)
+        self.param.update(reactflow_nodes=[dict(n) for n in self.reactflow_nodes],
+                          edges=[dict(e) for e in self.edges])
+
+    def _sync_shared(self):
+        """ Show the current elements of the shared graph """
+        master = self._shared._master
+        self._pane_sources = master._pane_sources
+        self._panes = self._materialize({
+            id_: pane for id_, pane in self._pane_sources.items()
+            if not self.lazy_panes or id_ in self._visible
+        })
+        self.param.update(reactflow_nodes=master.reactflow_nodes,
+                          edges=master.edges,
+                          panel_nodes=list(self._panes.values()),
+                          pane_ids=list(self._panes))
+
+    def _receive_shared(self, message):
+        """ Forward a change applied to the shared graph to the browser """
+        removed = self._removed_ids(message["nodes"])
+        for field in ("nodes", "edges"):
+            self._selection[field].difference_update(
+                self._removed_ids(message[field]))
+        added = {
+            c["item"]["id"] for c in message["nodes"]
+            if c["type"] in ("add", "replace")
+            and c["item"]["id"] in self._pane_sources
+            and c["item"]["id"] not in self._panes
+        }
+        self._update_panes(self._materialize({
+            id_: self._pane_sources[id_] for id_ in added
+            if not self.lazy_panes or id_ in self._visible
+        }), removed)
+        self._send_msg(message)
+
+    ###########################################################################
+    ## View
+    ###########################################################################
+    def highlight(self, nodes=(), edges=(), fit=False):
+        """
+        Emphasize the given nodes and edges and dim the others, without
+        sending the elements again. With fit, the viewport is fitted to the
+        highlighted nodes.
+        """
+        nodes = list(nodes)
+        self.highlighted = {"nodes": nodes, "edges": list(edges)}
+        if fit and nodes:
+            self.fit_view(nodes)
+
+    def clear_highlight(self):
+        self.highlighted = {"nodes": [], "edges": []}
+
+    def fit_view(self, nodes=None, padding=0.2, duration=300):
+        """ Fit the viewport to the given nodes, or to all nodes """
+        self._send_msg({
+            "type": "fit_view",
+            "nodes": None if nodes is None else list(nodes),
+            "padding": padding,
+            "duration": duration,
+        })
+
+    ###########################################################################
+    ## Persistence
+    ###########################################################################
+    def autosave(self, path):
+        """
+        Save the nodes and edges to the directory path and append every
+        change to its log, see the persist module. Panes and node data other
+        than the label are not saved.
+        """
+        self._log = GraphLog(path)
+        self._save_snapshot()
+
+    @classmethod
+    def load(cls, path, mmap=True, **params):
+        """ Create a component from a directory written by autosave """
+        nodes, edges = GraphLog(path).load(mmap=mmap).to_reactflow()
+        return cls(nodes=nodes, edges=edges, **params)
+
+    @param.depends("reactflow_nodes", "edges", watch=True)
+    def _save_snapshot(self):
+        if self._log is not None:
+            self._log.save(GraphStore.from_reactflow(
+                self.reactflow_nodes, self.edges))
+
+    ###########################################################################
+    ## Telemetry
+    ###########################################################################
+    def on_telemetry(self, callback):
+        """
+        Register a callback that is called with a SyncEvent for every step
+        of the sync, only while telemetry is enabled.
+        """
+        self._telemetry_callbacks.append(callback)
+
+    @contextmanager
+    def _measure(self, stage, message=None):
+        """
+        Time the block as a SyncEvent, the event (None if telemetry is
+        disabled) can be completed inside the block.
+        """
+        if not self.telemetry:
+            yield None
+            return
+        event = SyncEvent(stage=stage, duration=0.)
+        if message is not None:
+            event.payload_bytes = _payload_size(message)
+            event.n_nodes = len(message.get("nodes", []))
+            event.n_edges = len(message.get("edges", []))
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            event.duration = time.perf_counter() - start
+            self._emit(event)
+
+    def _emit(self, event):
+        logger.debug("%s", event)
+        for callback in self._telemetry_callbacks:
+            callback(event)
+
+    ###########################################################################
+    ## Change-set protocol
+    ###########################################################################
+    def on_change(self, callback):
+        """
+        Register a callback that is called with a GraphChange every time the
+        frontend reports node or edge changes (drag stop, selection, connect,
+        delete).
+        """
+        self._change_callbacks.append(callback)
+
+    def apply_changes(self, nodes=None, edges=None):
+        """
+        Apply React Flow change records to the python state and send only the
+        records to the browser instead of the full node and edge lists.
+        """
+        if self._shared is not None:
+            self._shared.apply_changes(nodes=nodes, edges=edges)
+            return
+        node_changes, panes = self._prepare_node_changes(nodes or [])
+        change = GraphChange(nodes=node_changes, edges=list(edges or []))
+        self._apply_changes("reactflow_nodes", change.nodes)
+        self._apply_changes("edges", change.edges)
+        self._update_pane_sources(panes, self._removed_ids(change.nodes))
+        if self._log is not None:
+            self._log.append(change.nodes, change.edges)
+        if change.nodes or change.edges:
+            message = {
+                "type": "changes",
+                "nodes": self._strip_changes(change.nodes,
+                                             self.default_node_options),
+                "edges": self._strip_changes(change.edges,
+                                             self.default_edge_options),
+            }
+            with self._measure("send", message):
+                self._send_msg(message)
+
+    def stream(self, nodes=None, edges=None, rollover=None):
+        """
+        Append nodes and edges, only the new elements are sent to the
+        browser. With rollover, only the last `rollover` nodes and edges are
+        kept; older nodes are removed together with their edges.
+        """
+        nodes, edges = list(nodes or []), list(edges or [])
+        node_changes = [{"type": "add", "item": n} for n in nodes]
+        edge_changes = [{"type": "add", "item": e} for e in edges]
+        if rollover is not None:
+            n_drop = len(self.reactflow_nodes) + len(nodes) - rollover
+            dropped = {n["id"] for n in (self.reactflow_nodes + nodes)[:max(n_drop, 0)]}
+            node_changes = [
+                c for c in node_changes if c["item"]["id"] not in dropped
+            ] + [{"type": "remove", "id": id_} for id_ in dropped
+                 if self._index("reactflow_nodes").get(id_) is not None]
+            all_edges = [
+                e for e in self.edges + edges
+                if e["source"] not in dropped and e["target"] not in dropped
+            ]
+            kept = {e["id"] for e in all_edges[max(len(all_edges) - rollover, 0):]}
+            edge_changes = [
+                c for c in edge_changes if c["item"]["id"] in kept
+            ] + [{"type": "remove", "id": e["id"]} for e in self.edges
+                 if e["id"] not in kept]
+        self.apply_changes(nodes=node_changes, edges=edge_changes)
+
+    def patch(self, nodes=None, edges=None):
+        """
+        Update existing nodes and edges, given as dicts with an 'id' and the
+        keys to change ('data' is merged). Only the changed elements are sent,
+        as position or select records where possible.
+        """
+        self.apply_changes(
+            nodes=[self._patch_change("reactflow_nodes", n) for n in nodes or []],
+            edges=[self._patch_change("edges", e) for e in edges or []])
+
+    def _patch_change(self, field, patch):
+        keys = set(patch) - {"id"}
+        if keys == {"position"}:
+            return {"type": "position", "id": patch["id"],
+                    "position": patch["position"]}
+        if keys == {"selected"}:
+            return {"type": "select", "id": patch["id"],
+                    "selected": patch["selected"]}
+        current = getattr(self, field)[self._index(field)[patch["id"]]]
+        item = {**current, **patch}
+        if "data" in patch:
+            item["data"] = {**current.get("data", {}), **patch["data"]}
+        return {"type": "replace", "id": patch["id"], "item": item}
+
+    def _prepare_node_changes(self, changes):
+        """ Split the panes from added or replaced nodes """
+        prepared = []
+        panes = {}
+        for change in changes:
+            if change["type"] in ("add", "replace"):
+                item = dict(change["item"])
+                pane = item.pop("panes", None)
+                if pane is not None:
+                    panes[item["id"]] = pane
+                has_pane = pane is not None or item["id"] in self._pane_sources
+                change = {**change, "item": self._process_node(item, has_pane)}
+            prepared.append(change)
+        return prepared, panes
+
+    @staticmethod
+    def _strip_changes(changes, defaults):
+        """ Only send the overrides of the defaults in added elements """
+        if not defaults:
+            return changes
+        return [
+            {**c, "item": strip_defaults(c["item"], defaults)}
+            if "item" in c else c for c in changes
+        ]
+
+    @staticmethod
+    def _merge_changes(changes, defaults):
+        """ Restore the defaults stripped from the elements of the browser """
+        if not defaults:
+            return changes
+        return [
+            {**c, "item": {**defaults, **c["item"]}} if "item" in c else c
+            for c in changes
+        ]
+
+    def _process_param_change(self, params):
+        params = super()._process_param_change(params)
+        if self.default_node_options and "reactflow_nodes" in params:
+            params["reactflow_nodes"] = [
+                strip_defaults(n, self.default_node_options)
+                for n in params["reactflow_nodes"]]
+        if self.default_edge_options and "edges" in params:
+            params["edges"] = [
+                strip_defaults(e, self.default_edge_options)
+                for e in params["edges"]]
+        return params
+
+    @staticmethod
+    def _removed_ids(changes):
+        return [c["id"] for c in changes if c["type"] == "remove"]
+
+    def _index(self, field):
+        """ id -> position lookup, rebuilt only when the list is replaced """
+        if self._shared is not None:
+            return self._shared._master._index(field)
+        elements = getattr(self, field)
+        cached = self._indices.get(field)
+        if cached is None or cached[0] is not elements:
+            cached = (elements, {e["id"]: i for i, e in enumerate(elements)})
+            self._indices[field] = cached
+        return cached[1]
+
+    def _apply_changes(self, field, changes):
+        """
+        Mirror applyNodeChanges/applyEdgeChanges on the python copy of the
+        elements. The list is updated in place so nothing is sent back.
+        """
+        elements = getattr(self, field)
+        index = self._index(field)
+        removed = set()
+        for change in changes:
+            if change["type"] == "add":
+                index[change["item"]["id"]] = len(elements)
+                elements.append(dict(change["item"]))
+                continue
+            i = index.get(change.get("id"))
+            if i is None:
+                continue
+            if change["type"] == "position" and "position" in change:
+                elements[i]["position"] = change["position"]
+            elif change["type"] == "select":
+                elements[i]["selected"] = change["selected"]
+            elif change["type"] == "replace":
+                elements[i] = change["item"]
+            elif change["type"] == "remove":
+                removed.add(change["id"])
+        if removed:
+            elements[:] = [e for e in elements if e["id"] not in removed]
+            self._indices[field] = (
+                elements, {e["id"]: i for i, e in enumerate(elements)})
+
+    def _handle_msg(self, msg):
+        if msg.get("type") == "viewport":
+            self._update_viewport(msg["visible"])
+            return
+        if msg.get("type") != "changes":
+            return
+        with self._measure("receive", msg) as event:
+            if event is not None:
+                event.client = _client_stamps(msg)
+            change = GraphChange(
+                nodes=self._merge_changes(msg.get("nodes", []),
+                                          self.default_node_options),
+                edges=self._merge_changes(msg.get("edges", []),
+                                          self.default_edge_options))
+            if self._shared is not None:
+                self._receive_from_session(change)
             else:
-                n["data"] = {"pane_index": i}
+                self._apply_changes("reactflow_nodes", change.nodes)
+                self._apply_changes("edges", change.edges)
+                self._update_pane_sources(
+                    removed=self._removed_ids(change.nodes))
+            if self._log is not None:
+                self._log.append(change.nodes, change.edges)
+            for callback in self._change_callbacks:
+                callback(change)
+
+
+    def _receive_from_session(self, change):
+        """
+        Keep the selection for this session and apply the other records to
+        the shared graph, which forwards them to the other sessions.
+        """
+        shared = GraphChange()
+        for field in ("nodes", "edges"):
+            for record in getattr(change, field):
+                if record["type"] == "select":
+                    selection = self._selection[field]
+                    if record["selected"]:
+                        selection.add(record["id"])
+                    else:
+                        selection.discard(record["id"])
+                else:
+                    getattr(shared, field).append(record)
+        removed = self._removed_ids(shared.nodes)
+        for field in ("nodes", "edges"):
+            self._selection[field].difference_update(
+                self._removed_ids(getattr(shared, field)))
+        self._shared._receive(shared, origin=self)
+        self._update_panes(removed=removed)
+
+
+def _payload_size(obj):
+    """ Size in bytes of the json serialization of obj """
+    return len(json.dumps(obj, default=str))
 
-            reactflow_nodes.append(n)
 
-        return reactflow_nodes, panel_nodes
+def _client_stamps(msg):
+    """ Timings stamped by the browser on a message """
+    stamps = dict(msg.get("telemetry") or {})
+    sent_at = stamps.pop("sent_at", None)
+    if sent_at is not None:
+        stamps["transfer_ms"] = time.time() * 1000 - sent_at
+    return stamps
 
 
 class Node(param.Parameterized):
 
     id_ = param.String()
     xy = param.XYCoordinates()
-    name = param.String()
+    name = param.String(constant=False)
     selected = param.Boolean(default=False)
     react_props = param.Dict(default={})
 
@@ -123,37 +826,39 @@ class Node(param.Parameterized):
 
 class Edge(param.Parameterized):
 
+    id_ = param.String(default=None)
     source = param.ClassSelector(class_=Node)
     target = param.ClassSelector(class_=Node)
     selected = param.Boolean(default=False)
     react_props = param.Dict(default={})
     weight = param.Number(bounds=(0., 1.), default=None)
 
-    tabular_params = ["source_id", "target_id", "source_name", "target_name",]
+    tabular_params = ["source_id", "target_id", "source_name", "target_name",
+                      "weight"]
 
     def __init__(self, **params):
         super().__init__(**params)
-        self.id_ = f"Edge{self.source.id_}_{self.target.id_}"
+        if self.id_ is None:
+            self.id_ = f"{self.source.id_} -> {self.target.id_}"
 
     def to_reactflow(self):
         return {
-            "id": f"{self.source.id_} -> {self.target.id_}",
+            "id": self.id_,
             "source": self.source.id_,
             "target": self.target.id_,
-            "label": None if self.weight is None else f"{self.weight:.2%}",
+            "data": {"weight": self.weight},
             "selected": self.selected,
             **self.react_props,
         }
 
     @classmethod
     def from_reactflow(cls, d_nodes, kwargs, react_props=None):
-        """ Return edge instance """
+        """ Return edge instance, the weight is read from the edge data """
         if react_props is None:
             react_props = {}
-        weight = kwargs.get("label", None)
-        if weight is not None and weight[-1] == "%":
-            weight = float(weight[:-1]) / 100.
+        weight = (kwargs.get("data") or {}).get("weight")
         return cls(
+            id_=kwargs.get("id"),
             source=d_nodes[kwargs.pop("source")],
             target=d_nodes[kwargs.pop("target")],
             weight=weight,
@@ -173,24 +878,54 @@ class Edge(param.Parameterized):
 
 class ReactFlowEditor(pn.custom.PyComponent):
     """
+    Editor for a graph held in a columnar GraphStore, shown as a ReactFlow
+    canvas next to node and edge tables. For convenience the graph can also
+    be passed as lists of Node and Edge objects.
     """
-    # TODO
-    # * finish edge management
-    # * add edge
-    # * delete edge
-    # * modify edge
-    # * select edge
 
-    nodes = param.List(default=[])
-    edges = param.List(default=[])
+    graph = param.ClassSelector(class_=GraphStore, doc="""
+        Columnar store holding the nodes and edges of the editor.""")
+
+    history_bytes = param.Integer(default=2 ** 24, bounds=(0, None), doc="""
+        Memory budget of the undo history, the oldest edits are forgotten
+        beyond it.""")
+
+    processing = param.Selector(default="sync", objects=["sync", "thread"],
+                                doc="""
+        With 'thread', the events of the canvas and the tables of a served
+        session are handled on a worker thread instead of the event loop of
+        the session. Events arriving while a batch is processed are merged
+        into the next one, superseded records (e.g. intermediate positions)
+        being dropped, and full rebuilds are prepared on the worker. Only
+        the resulting updates are applied on the document thread. The
+        editing methods wait for the batch being processed to finish.""")
+
+    lineage = param.Selector(
+        default=None, objects=[None, "upstream", "downstream", "both"], doc="""
+        Highlight on the canvas the nodes upstream, downstream or both of
+        the selected nodes and the edges leading to them, as the selection
+        changes. While nodes are selected this takes precedence over the
+        highlight of the search.""")
 
     def __init__(self, **params):
-        self.reactflow_params = params.pop("reactflow_params", {})
+        # props shared by all elements are sent once when given as
+        # default_node_options/default_edge_options in reactflow_params, the
+        # props of new elements only apply to the elements added later
+        self.reactflow_params = dict(params.pop("reactflow_params", {}))
         self.new_node_react_props = params.pop("new_node_react_props", {})
         self.new_edge_react_props = params.pop("new_edge_react_props", {})
+        nodes = params.pop("nodes", [])
+        edges = params.pop("edges", [])
+        if params.get("graph") is None:
+            params["graph"] = GraphStore.from_elements(nodes, edges)
         super().__init__(**params)
+        if not _extension_loaded:
+            extension()
 
         # Initialise widgets
+        self._rows = {"nodes": {}, "edges": {}}
+        self._groups = NodeGroups()
+        self._projection = None
         self._reactflow = self._init_reactflow()
         self._nodes_tabulator = self._init_nodes_tabulator()
         self._edges_tabulator = self._init_edge_tabulator()
@@ -199,18 +934,56 @@ class ReactFlowEditor(pn.custom.PyComponent):
 
         # initialise watchers
         self._updating = {"nodes": False, "edges": False}
+        self._batch = None
+        self._lock = threading.RLock()
+        # guards the queue and the draining flag only, so that queuing an
+        # event never waits for the worker holding _lock
+        self._queue_lock = threading.Lock()
+        self._queue = deque()
+        self._draining = False
+        self._history = History(self.history_bytes)
+        self._log = None
+        self._compact_bytes = None
+        self._search = None
+        self._query = None
+        self._matches = {"nodes": None, "edges": None}
+        self._analytics = None
+        self._lineage_shown = False
         self._init_watchers()
 
         # initalise layout
         self._layout = self._create_layout()
 
+    @property
+    def nodes(self):
+        """ NodeRow proxies over the nodes in the graph """
+        return self.graph.nodes
+
+    @nodes.setter
+    def nodes(self, value):
+        ids = {n.id_ for n in value}
+        self.graph = GraphStore.from_elements(value, [
+            e for e in self.edges
+            if e.source.id_ in ids and e.target.id_ in ids
+        ])
+
+    @property
+    def edges(self):
+        """ EdgeRow proxies over the edges in the graph """
+        return self.graph.edges
+
+    @edges.setter
+    def edges(self, value):
+        self.graph = GraphStore.from_elements(self.nodes, value)
+
     ###########################################################################
     ## initialisation functions
     ###########################################################################
     def _init_reactflow(self):
+        nodes, edges = self._canvas_elements()
         return ReactFlowComponent(
-            nodes=[n.to_reactflow() for n in self.nodes],
-            edges=[e.to_reactflow() for e in self.edges],
+            nodes=nodes,
+            edges=edges,
             **self.reactflow_params
         )
 
@@ -221,7 +994,7 @@ class ReactFlowEditor(pn.custom.PyComponent):
             show_index=False,
             layout="fit_data",
             editors={"name": "input"},
-            buttons={'delete': '<i class="fa fa-trash"></i>'},
+            buttons={"delete": _ICONS["trash"]},
             selectable="checkbox",
             selection=selected,
             height=250,
@@ -235,29 +1008,163 @@ class ReactFlowEditor(pn.custom.PyComponent):
             show_index=False,
             layout="fit_data",
             editors={"weight": "input"},
-            buttons={'delete': '<i class="fa fa-trash"></i>'},
+            buttons={"delete": _ICONS["trash"]},
             selectable="checkbox",
             selection=selected,
             height=250,
             theme="simple",
         )
 
+    ###########################################################################
+    ## Queries
+    ###########################################################################
+    def get_node(self, id_):
+        """ Return the node with the given id """
+        return self.graph.node(id_)
+
+    def get_edge(self, id_):
+        """ Return the edge with the given id """
+        return self.graph.edge(id_)
+
+    def out_edges(self, id_):
+        """ Edges whose source is the node with the given id """
+        return [self.graph.edge(e) for e in self.graph.out_edge_ids(id_)]
+
+    def in_edges(self, id_):
+        """ Edges whose target is the node with the given id """
+        return [self.graph.edge(e) for e in self.graph.in_edge_ids(id_)]
+
+    def neighbors(self, id_):
+        """ Nodes connected to the node with the given id in either direction """
+        neighbors = {e.target.id_: e.target for e in self.out_edges(id_)}
+        neighbors.update((e.source.id_, e.source) for e in self.in_edges(id_))
+        return list(neighbors.values())
+
+    def nodes_in_box(self, x0, y0, x1, y1):
+        """ Nodes positioned inside the box, e.g. the viewport """
+        return [self.graph.node(id_)
+                for id_ in self.graph.nodes_in_box(x0, y0, x1, y1)]
+
+    def nearest_nodes(self, x, y, k=1):
+        """ The k nodes closest to the point, closest first """
+        return [self.graph.node(id_)
+                for id_ in self.graph.nearest_nodes(x, y, k)]
+
+    def overlapping_nodes(self, width=150., height=40.):
+        """ Pairs of nodes overlapping each other, see GraphStore """
+        return [(self.graph.node(a), self.graph.node(b))
+                for a, b in self.graph.overlapping_nodes(width, height)]
+
+    @property
+    def analytics(self):
+        """ Cached reachability and path queries, see GraphAnalytics """
+        if self._analytics is None:
+            self._analytics = GraphAnalytics.from_store(self.graph)
+        return self._analytics
+
+    def upstream(self, ids, max_depth=None):
+        """ Nodes from which any of the given nodes can be reached """
+        return [self.graph.node(id_) for id_ in self.analytics.reachable(
+            ids, "upstream", max_depth)]
+
+    def downstream(self, ids, max_depth=None):
+        """ Nodes reachable from any of the given nodes """
+        return [self.graph.node(id_) for id_ in self.analytics.reachable(
+            ids, "downstream", max_depth)]
+
+    def shortest_path(self, source, target, weighted=False, directed=True):
+        """ Nodes on a shortest path between two nodes, see GraphAnalytics """
+        path = self.analytics.shortest_path(source, target, weighted, directed)
+        return None if path is None else [self.graph.node(id_) for id_ in path]
+
     ###########################################################################
     ## Helper functions
     ###########################################################################
     def _nodes_to_df(self):
-        if not self.nodes:
-            return pd.DataFrame(columns=Node.tabular_params), []
-        df = pd.DataFrame([n.to_tabular() for n in self.nodes])
-        selected = [i for i, n in enumerate(self.nodes) if n.selected]
-        return df, selected
+        return self._to_df("nodes")
 
     def _edges_to_df(self):
-        if not self.edges:
-            return pd.DataFrame(columns=Edge.tabular_params), []
-        df = pd.DataFrame([e.to_tabular() for e in self.edges])
-        selected = [i for i, e in enumerate(self.edges) if e.selected]
-        return df, selected
+        return self._to_df("edges")
+
+    def _to_df(self, field):
+        self._reset_rows(field)
+        df = getattr(self.graph, f"{field}_to_tabular")()
+        selected = np.flatnonzero(self.graph.column(field, "selected"))
+        return df, selected.tolist()
+
+    def _reset_rows(self, field):
+        """ Map element ids to the index labels of a freshly built table """
+        ids = self.graph.ids(field)
+        self._rows[field] = dict(zip(ids.tolist(), range(len(ids))))
+
+    def _patch_tabulator(self, field, changes):
+        """
+        Apply change records to the rows of a tabulator: patch the changed
+        rows, stream added ones and drop removed ones instead of rebuilding
+        the whole table.
+        """
+        tabulator = getattr(self, f"_{field}_tabulator")
+        to_tabular = getattr(self.graph, f"{field}_to_tabular")
+        graph_rows = self.graph._rows[field]
+        rows = self._rows[field]
+        patches = defaultdict(list)
+        added, replaced, removed, selected = [], [], set(), {}
+        for change in changes:
+            kind = change["type"]
+            if kind == "position":
+                pos = change["position"]
+                patches["x"].append((change["id"], pos["x"]))
+                patches["y"].append((change["id"], pos["y"]))
+            elif kind == "select":
+                selected[change["id"]] = change["selected"]
+            elif kind == "remove":
+                removed.add(change["id"])
+            elif kind == "add" and change["item"]["id"] in graph_rows:
+                added.append(change["item"]["id"])
+            elif kind == "replace" and change["id"] in graph_rows:
+                replaced.append(change["id"])
+        if replaced:
+            df = to_tabular(self.graph.rows(field, replaced))
+            for column in df.columns:
+                patches[column].extend(zip(replaced, df[column].tolist()))
+
+        if removed:
+            labels = [rows.pop(id_) for id_ in removed if id_ in rows]
+            tabulator.value = tabulator.value.drop(index=labels)
+        if added:
+            start = max(rows.values(), default=-1) + 1
+            labels = list(range(start, start + len(added)))
+            rows.update(zip(added, labels))
+            df = to_tabular(self.graph.rows(field, added))
+            df.index = labels
+            tabulator.stream(df, reset_index=False)
+        patches = {
+            column: [(rows[id_], value) for id_, value in values
+                     if id_ in rows and id_ not in removed]
+            for column, values in patches.items()
+        }
+        patches = {column: values for column, values in patches.items()
+                   if values}
+        if patches:
+            tabulator.patch(patches)
+
+        if removed or added:
+            selection = np.flatnonzero(
+                self.graph.column(field, "selected")).tolist()
+        elif selected:
+            positions = tabulator.value.index.get_indexer(
+                [rows[id_] for id_ in selected])
+            selection = set(tabulator.selection)
+            for position, is_selected in zip(positions, selected.values()):
+                if is_selected:
+                    selection.add(int(position))
+                else:
+                    selection.discard(int(position))
+            selection = sorted(selection)
+        else:
+            return
+        if tabulator.selection != selection:
+            tabulator.selection = selection
 
     ###########################################################################
     ## WATCHERS
@@ -265,147 +1172,1021 @@ class ReactFlowEditor(pn.custom.PyComponent):
 
     def _init_watchers(self):
         """ Setup all the watchers """
-        # global watcher to update UI based on state
-        self.param.watch(self._update_ui, ["nodes", "edges"])
+        # global watcher to update UI when the graph is replaced
+        self.param.watch(self._offload(self._update_ui), "graph")
+        self.param.watch(self._graph_replaced, "graph")
 
-        # update state based on reactflow
-        self._reactflow.param.watch(self._update_from_reactflow, 
-                                    ["nodes", "edges"])
+        # update state based on the change records sent by reactflow
+        self._reactflow.on_change(self._offload(self._update_from_reactflow))
 
         # update state based on node tabulator
-        self._nodes_tabulator.on_edit(self._update_nodes_from_tabulator_edit)
-        self._nodes_tabulator.param.watch(
-            self._update_selection_from_tabulator("nodes"), "selection")
-        self._nodes_tabulator.on_click(self._handle_tabulator_delete("nodes"))
+        self._nodes_tabulator.on_edit(self._offload(
+            self._update_nodes_from_tabulator_edit, "nodes",
+            self._cell_ids("nodes")))
+        self._nodes_tabulator.param.watch(self._offload(
+            self._update_selection_from_tabulator("nodes"), "nodes",
+            self._selection_ids("nodes")), "selection")
+        self._nodes_tabulator.on_click(self._offload(
+            self._handle_tabulator_delete("nodes"), "nodes",
+            self._cell_ids("nodes")))
 
 
         # update state based on edge tabulator
-        self._edges_tabulator.on_click(self._handle_tabulator_delete("edges"))
-        self._edges_tabulator.on_edit(self._update_edges_from_tabulator_edit)
-        self._edges_tabulator.param.watch(
-            self._update_selection_from_tabulator("edges"), "selection")
+        self._edges_tabulator.on_click(self._offload(
+            self._handle_tabulator_delete("edges"), "edges",
+            self._cell_ids("edges")))
+        self._edges_tabulator.on_edit(self._offload(
+            self._update_edges_from_tabulator_edit, "edges",
+            self._cell_ids("edges")))
+        self._edges_tabulator.param.watch(self._offload(
+            self._update_selection_from_tabulator("edges"), "edges",
+            self._selection_ids("edges")), "selection")
 
         # update state when clicking a button
-        self._add_node_button.on_click(self._add_node)
+        self._add_node_button.on_click(self._offload(self._add_node))
+
+        # tables only show the search matches while a search is active, the
+        # filters are only added then since any filter makes Tabulator resend
+        # the whole table on each patch
+        self._table_filters = {
+            field: partial(self._filter_table, field)
+            for field in ("nodes", "edges")}
+
+    def _push_changes(self, field, changes, sync=True):
+        """
+        Propagates an update of the graph described by the given change
+        records. The records are sent to the reactflow component (unless they
+        came from it) and patched into the tabulator, neither of them receives
+        the full graph. Inside a batch the records are only collected.
+        """
+        if not changes:
+            return
+        if self._batch is not None:
+            self._batch[field].extend((change, sync) for change in changes)
+            return
+        if sync:
+            self._send_to_canvas(**{field: changes})
+        self._patch_changes(field, changes)
+        self._log_changes(**{field: changes})
+
+    def _patch_changes(self, field, changes):
+        self._updating[field] = True
+        try:
+            with self._reactflow._measure("editor.table") as event:
+                if event is not None:
+                    setattr(event, f"n_{field}", len(changes))
+                self._patch_tabulator(field, changes)
+        finally:
+            self._updating[field] = False
+        if self._search is not None:
+            self._search.update(self.graph, field, changes)
+            if self._query is not None:
+                self._run_search()
+        if self._analytics is not None:
+            self._analytics.update(field, changes)
+        if self.lineage is not None and any(
+                change["type"] in ("add", "remove")
+                or field == "nodes" and change["type"] == "select"
+                for change in changes):
+            self._show_lineage()
 
     ###########################################################################
-    ## GENERIC WATCHERS
-    def _update_ui(self, event):
+    ## EDITING API
+    ###########################################################################
+    @contextmanager
+    def batch(self):
         """
-        Updates both ReactFlow and Tabulator when the main 'nodes' list 
-        changes.
+        Context manager deferring all updates of the canvas and the tables
+        until the block exits. The accumulated change records are then sent
+        to the browser in a single message and each table is patched once.
+
+        >>> with editor.batch():
+        ...     for id_ in ids:
+        ...         editor.update_node(id_, selected=True)
         """
-        field = event.name
-        setattr(self._reactflow, field, [
-            e.to_reactflow() for e in getattr(self, field)])
-        df, selected = getattr(self, f"_{field}_to_df")()
-        tabulator = getattr(self, f"_{field}_tabulator")
-        tabulator.value = df
-        if tabulator.selection != selected:
-            tabulator.selection = selected
+        # with threaded processing, wait for the worker to finish its batch
+        with self._lock:
+            if self._batch is not None:
+                # nested batches are flushed by the outermost one
+                yield
+                return
+            self._batch = {
+                "nodes": [], "edges": [], "full": False, "canvas": False}
+            try:
+                # the edits of a batch are undone together
+                with self._history.group():
+                    yield
+            finally:
+                pending, self._batch = self._batch, None
+                self._flush(pending)
+
+    def _flush(self, pending, full=None):
+        with pn.io.hold():
+            if pending["full"]:
+                self._apply_full(full or self._full_state())
+                # records of the batch may predate the replacement of the
+                # graph, the log restarts from the final state instead
+                if self._log is not None:
+                    self._log.save(self.graph)
+                return
+            send = {
+                field: coalesce_changes(
+                    [change for change, sync in pending[field] if sync])
+                for field in ("nodes", "edges")
+            }
+            if pending["canvas"]:
+                self._update_canvas()
+            elif send["nodes"] or send["edges"]:
+                self._send_to_canvas(**send)
+            changes = {
+                field: coalesce_changes([change for change, _ in pending[field]])
+                for field in ("nodes", "edges")
+            }
+            for field in ("nodes", "edges"):
+                if changes[field]:
+                    self._patch_changes(field, changes[field])
+            self._log_changes(**changes)
+
+    @_locked
+    def add_node(self, name="", xy=None, id_=None, selected=False,
+                 react_props=None):
+        """
+        Add a node, returns its id. Without xy the node is placed next to
+        the existing nodes.
+        """
+        id_ = str(uuid.uuid4()) if id_ is None else id_
+        self.graph.add_nodes(
+            [id_], [0. if xy is None else xy[0]], [0. if xy is None else xy[1]],
+            names=[name],
+            selected=[selected],
+            react_props=[self.new_node_react_props if react_props is None
+                         else react_props],
+        )
+        if xy is None:
+            self.graph.set_positions([id_], *place_nodes(self.graph, [id_]))
+        self._history.record(("add", [id_], []))
+        self._push_changes("nodes", [
+            {"type": "add", "item": self.graph.node(id_).to_reactflow()}])
+        return id_
+
+    @_locked
+    def add_edge(self, source, target, weight=None, id_=None, selected=False,
+                 react_props=None):
+        """ Add an edge between two node ids, returns its id """
+        id_ = f"{source} -> {target}" if id_ is None else id_
+        self.graph.add_edges(
+            [id_], [source], [target],
+            weights=[np.nan if weight is None else weight],
+            selected=[selected],
+            react_props=[self.new_edge_react_props if react_props is None
+                         else react_props],
+        )
+        self._history.record(("add", [], [id_]))
+        self._push_changes("edges", [
+            {"type": "add", "item": self.graph.edge(id_).to_reactflow()}])
+        return id_
+
+    @_locked
+    def update_node(self, id_, xy=None, name=None, selected=None):
+        """ Move, rename or (de)select a node """
+        node = self.graph.node(id_)
+        changes = []
+        if xy is not None:
+            self._record_move([id_])
+            node.xy = xy
+            changes.append({"type": "position", "id": id_,
+                            "position": {"x": xy[0], "y": xy[1]}})
+        if selected is not None:
+            self._record_select("nodes", [id_])
+            node.selected = selected
+            changes.append({"type": "select", "id": id_,
+                            "selected": bool(selected)})
+        if name is not None:
+            self._history.record(("rename", id_, node.name))
+            node.name = name
+            changes.append({"type": "replace", "id": id_,
+                            "item": node.to_reactflow()})
+            # the edge table shows the node names as well
+            self._push_changes("edges", [
+                {"type": "replace", "id": e.id_}
+                for e in self.in_edges(id_) + self.out_edges(id_)
+            ], sync=False)
+        self._push_changes("nodes", changes)
+
+    @_locked
+    def update_edge(self, id_, weight=None, selected=None):
+        """ Change the weight of or (de)select an edge """
+        edge = self.graph.edge(id_)
+        changes = []
+        if selected is not None:
+            self._record_select("edges", [id_])
+            edge.selected = selected
+            changes.append({"type": "select", "id": id_,
+                            "selected": bool(selected)})
+        if weight is not None:
+            self._history.record(("weight", id_, edge.weight))
+            edge.weight = weight
+            changes.append({"type": "replace", "id": id_,
+                            "item": edge.to_reactflow()})
+        self._push_changes("edges", changes)
+
+    @_locked
+    def move_nodes(self, ids, x, y):
+        """ Move several nodes at once """
+        ids = list(ids)
+        self._record_move(ids)
+        self.graph.set_positions(ids, x, y)
+        self._push_changes("nodes", [
+            {"type": "position", "id": id_, "position": {"x": x_, "y": y_}}
+            for id_, x_, y_ in zip(ids, np.asarray(x, dtype=float).tolist(),
+                                   np.asarray(y, dtype=float).tolist())
+        ])
+
+    @_locked
+    def select_box(self, x0, y0, x1, y1, add=False):
+        """
+        Select the nodes positioned inside the box, the other nodes are
+        deselected unless add.
+        """
+        inside = self.graph.nodes_in_box(x0, y0, x1, y1)
+        selected = self.graph.column("nodes", "selected")
+        # only the nodes in the box and the selected ones can change
+        was = set(self.graph.ids("nodes")[np.flatnonzero(selected)].tolist())
+        with self.batch():
+            for id_ in inside:
+                if id_ not in was:
+                    self.update_node(id_, selected=True)
+            if not add:
+                for id_ in was.difference(inside):
+                    self.update_node(id_, selected=False)
+
+    @_locked
+    def layout(self, method="layered", ids=None, **kwargs):
+        """
+        Lay out the nodes and move them in a single batch.
+
+        method is 'layered' (for directed acyclic graphs) or 'force'. With
+        ids, only these nodes are placed next to their neighbours and the
+        others stay in place. kwargs are passed to the layout function, see
+        the layout module.
+        """
+        if ids is not None:
+            ids = list(ids)
+            x, y = place_nodes(self.graph, ids, **kwargs)
+        elif method == "layered":
+            ids = self.graph.ids("nodes").tolist()
+            x, y = layered_layout(self.graph, **kwargs)
+        elif method == "force":
+            ids = self.graph.ids("nodes").tolist()
+            x, y = force_layout(self.graph, **kwargs)
+        else:
+            raise ValueError(
+                f"Unknown layout {method!r}, use 'layered' or 'force'")
+        with self.batch():
+            self.move_nodes(ids, x, y)
+
+    @_locked
+    def remove_nodes(self, ids):
+        """ Remove nodes and the edges attached to them """
+        self._remove_nodes(ids)
+
+    @_locked
+    def remove_edges(self, ids):
+        """ Remove edges """
+        self._remove_edges(ids)
+
+    def autosave(self, path, compact_bytes=None):
+        """
+        Save the graph to the directory path and append every edit to its
+        log, so saving costs the size of the edit. With compact_bytes, the
+        snapshot is rewritten once the log grows beyond it.
+        """
+        self._log = GraphLog(path)
+        self._compact_bytes = compact_bytes
+        self._log.save(self.graph)
+
+    @classmethod
+    def load(cls, path, mmap=True, **params):
+        """
+        Create an editor from a directory written by autosave, the snapshot
+        is memory-mapped and the log replayed on top of it.
+        """
+        return cls(graph=GraphLog(path).load(mmap=mmap), **params)
+
+    @_locked
+    def undo(self):
+        """
+        Revert the last edit (a batch counts as one edit), returns whether
+        there was one. The reverted changes are synced as a single batch.
+        """
+        ops = self._history.pop_undo()
+        if ops is None:
+            return False
+        with self._history.replaying("redo"), self.batch():
+            for op in reversed(ops):
+                self._revert(op)
+        return True
+
+    @_locked
+    def redo(self):
+        """ Reapply the last undone edit, returns whether there was one """
+        ops = self._history.pop_redo()
+        if ops is None:
+            return False
+        with self._history.replaying("undo"), self.batch():
+            for op in reversed(ops):
+                self._revert(op)
+        return True
+
+    def on_telemetry(self, callback):
+        """
+        Register a callback receiving the SyncEvents of the canvas and the
+        tables, enable them with reactflow_params={"telemetry": True}.
+        """
+        self._reactflow.on_telemetry(callback)
+
+    ###########################################################################
+    ## SEARCH
+    def search(self, query, prefix=True, filter=True, highlight=True,
+               fit=False):
+        """
+        Find the nodes and edges having a word starting with each word of
+        the query (or equal to it without prefix) in their id, name, end
+        nodes or react_props. The matches are shown alone in the tables
+        (filter), emphasized on the canvas (highlight) and the viewport is
+        fitted to the matching nodes (fit). The search stays active as the
+        graph changes until clear_search. Returns the matching ids.
+        """
+        if not tokenize(query):
+            self.clear_search()
+            return {"nodes": [], "edges": []}
+        self._query = {"query": query, "prefix": prefix, "filter": filter,
+                       "highlight": highlight}
+        matches = self._run_search()
+        if fit and matches["nodes"]:
+            self._reactflow.fit_view(self._canvas_ids(matches["nodes"])[0])
+        return matches
+
+    def clear_search(self):
+        """ Show all rows again and remove the highlight """
+        self._query = None
+        self._show_matches(None)
+
+    def _run_search(self):
+        if self._search is None:
+            self._search = SearchIndex.from_store(self.graph)
+        query = self._query
+        matches = {}
+        for field in ("nodes", "edges"):
+            ids = self._search.search(field, query["query"], query["prefix"])
+            # while a batch is patched, the other table may not be reindexed
+            rows = self.graph._rows[field]
+            matches[field] = sorted((id_ for id_ in ids if id_ in rows),
+                                    key=rows.__getitem__)
+        self._show_matches(matches)
+        return matches
+
+    def _show_matches(self, matches):
+        query = self._query or {}
+        for field in ("nodes", "edges"):
+            shown = set(matches[field]) \
+                if matches is not None and query["filter"] else None
+            if shown == self._matches[field]:
+                continue
+            filtered = self._matches[field] is not None
+            self._matches[field] = shown
+            tabulator = getattr(self, f"_{field}_tabulator")
+            table_filter = self._table_filters[field]
+            self._updating[field] = True
+            try:
+                # filter functions are only reapplied when the filters change
+                with pn.io.hold():
+                    if filtered:
+                        tabulator.remove_filter(table_filter)
+                    if shown is not None:
+                        tabulator.add_filter(table_filter)
+            finally:
+                self._updating[field] = False
+        if self._lineage_shown:
+            # the lineage of the selection is highlighted, see _show_lineage
+            return
+        if matches is not None and query["highlight"]:
+            self._reactflow.highlight(
+                *self._canvas_ids(matches["nodes"], matches["edges"]))
+        elif self._reactflow.highlighted["nodes"] \
+                or self._reactflow.highlighted["edges"]:
+            self._reactflow.clear_highlight()
+
+    def _filter_table(self, field, df):
+        shown = self._matches[field]
+        if shown is None:
+            return df
+        if field == "nodes":
+            return df[df["id"].isin(shown)]
+        rows = self._rows[field]
+        return df[df.index.isin([rows[id_] for id_ in shown if id_ in rows])]
+
+    def _canvas_ids(self, nodes, edges=()):
+        """ Ids of the given elements on the canvas, see groups """
+        if self._projection is None:
+            return list(nodes), list(edges)
+        hidden_by = self._groups.hidden_by
+        nodes = dict.fromkeys(
+            id_ if hidden_by(id_) is None else GROUP_PREFIX + hidden_by(id_)
+            for id_ in nodes)
+        shown = self._projection["edges"]
+        return list(nodes), [id_ for id_ in edges if id_ in shown]
+
+    ###########################################################################
+    ## LINEAGE
+    @param.depends("lineage", watch=True)
+    def _show_lineage(self):
+        selected = self.graph.ids("nodes")[
+            self.graph.column("nodes", "selected")].tolist()
+        if self.lineage is not None and selected:
+            self._lineage_shown = True
+            self._reactflow.highlight(*self._canvas_ids(
+                *self.analytics.lineage(selected, self.lineage)))
+        elif self._lineage_shown:
+            self._lineage_shown = False
+            if self._query is not None:
+                self._run_search()
+            else:
+                self._reactflow.clear_highlight()
+
+    ###########################################################################
+    ## GROUPS
+    @property
+    def groups(self):
+        """ Groups by name with their nodes, subgroups and collapsed state """
+        collapsed = self._groups.collapsed
+        groups = {name: {"nodes": [], "groups": [],
+                         "collapsed": name in collapsed}
+                  for name in self._groups}
+        for id_ in self.graph.ids("nodes").tolist():
+            group = self._groups.group_of(id_)
+            if group is not None:
+                groups[group]["nodes"].append(id_)
+        for name in groups:
+            parent = self._groups.parent(name)
+            if parent is not None:
+                groups[parent]["groups"].append(name)
+        return groups
+
+    @_locked
+    def group_nodes(self, name, ids=(), groups=(), collapsed=True):
+        """
+        Group nodes and existing groups under name. A collapsed group is
+        shown as a single node with the edges to its members merged.
+        """
+        with self.batch():
+            self._groups.add(name, list(ids), list(groups), collapsed)
+            self._update_canvas()
 
-    def _update_from_reactflow(self, *events):
+    @_locked
+    def group_by(self, by, collapsed=True):
         """
-        Updates the master 'nodes' list when nodes are changed in ReactFlow 
-        (drag/select).
+        Group the nodes by the value of a node column (e.g. 'name'), a key
+        of their react_props or a function of the node. Nodes whose value
+        is None are not grouped. Returns the names of the groups.
         """
-        for event in events:
-            field = event.name
-            if not self._updating[field]:
+        ids = self.graph.ids("nodes").tolist()
+        if callable(by):
+            keys = [by(self.graph.node(id_)) for id_ in ids]
+        elif by in NODE_COLUMNS:
+            keys = self.graph.column("nodes", by).tolist()
+        else:
+            keys = [props.get(by) for props in
+                    self.graph.column("nodes", "react_props")]
+        members = defaultdict(list)
+        for id_, key in zip(ids, keys):
+            if key is not None:
+                members[str(key)].append(id_)
+        with self.batch():
+            for name, group in members.items():
+                self._groups.add(name, group, collapsed=collapsed)
+            self._update_canvas()
+        return list(members)
+
+    @_locked
+    def ungroup(self, name):
+        """ Remove a group, its members move to the enclosing group """
+        with self.batch():
+            self._groups.remove(name)
+            self._update_canvas()
+
+    @_locked
+    def collapse(self, *names):
+        """ Collapse the given groups, or all groups """
+        with self.batch():
+            self._groups.collapse(names or list(self._groups))
+            self._update_canvas()
+
+    @_locked
+    def expand(self, *names):
+        """ Expand the given groups, or all groups """
+        with self.batch():
+            self._groups.expand(names or list(self._groups))
+            self._update_canvas()
+
+    def _canvas_elements(self):
+        """
+        React Flow nodes and edges shown on the canvas: the whole graph, or
+        its visible level when groups are collapsed.
+        """
+        if not self._groups.collapsed:
+            self._projection = None
+            return self.graph.to_reactflow()
+        nodes, edges, self._projection = self._groups.project(self.graph)
+        return nodes, edges
+
+    def _update_canvas(self):
+        if self._batch is not None:
+            self._batch["canvas"] = True
+            return
+        nodes, edges = self._canvas_elements()
+        with pn.io.hold():
+            self._reactflow.nodes = nodes
+            self._reactflow.edges = edges
+            # the highlight refers to the elements shown, see _canvas_ids
+            if self._lineage_shown:
+                self._show_lineage()
+            elif self._query is not None:
+                self._run_search()
+
+    def _send_to_canvas(self, nodes=(), edges=()):
+        """
+        Send change records to the canvas, translated to the visible level
+        when groups are collapsed: moves of hidden nodes move their
+        aggregate, their selection is not shown and structural changes
+        touching a collapsed group rebuild the canvas.
+        """
+        if self._projection is not None:
+            nodes, edges = self._project_changes(nodes, edges)
+            if nodes is None:
+                self._update_canvas()
+                return
+        if nodes or edges:
+            self._reactflow.apply_changes(nodes=list(nodes), edges=list(edges))
+
+    def _project_changes(self, nodes, edges):
+        members = self._projection["members"]
+        hidden_by = self._groups.hidden_by
+        projected, moved = [], {}
+        for change in nodes:
+            id_ = change["item"]["id"] if change["type"] == "add" \
+                else change["id"]
+            group = hidden_by(id_)
+            if change["type"] == "remove" and \
+                    id_ in self._projection["hidden"]:
+                # removed nodes already left their group, see _remove_nodes
+                return None, None
+            if group is None:
+                projected.append(change)
+            elif change["type"] in ("add", "remove") or group not in members:
+                return None, None
+            elif change["type"] == "position":
+                moved[group] = members[group]
+        x, y = aggregate_positions(self.graph, moved)
+        projected += [
+            {"type": "position", "id": GROUP_PREFIX + group,
+             "position": {"x": x_, "y": y_}}
+            for group, x_, y_ in zip(moved, x, y)]
+        shown = []
+        for change in edges:
+            if change["type"] == "add":
+                item = change["item"]
+                if hidden_by(item["source"]) or hidden_by(item["target"]):
+                    return None, None
+            elif change["id"] not in self._projection["edges"]:
+                if change["type"] != "select":
+                    # the merged edge it belongs to changes
+                    return None, None
+                continue
+            shown.append(change)
+        return projected, shown
+
+    def _move_aggregate(self, change):
+        """ Move the members of an aggregate dragged on the canvas """
+        group = change["id"][len(GROUP_PREFIX):]
+        ids = (self._projection or {"members": {}})["members"].get(group)
+        if not ids or change["type"] != "position":
+            return
+        x, y = aggregate_positions(self.graph, {group: ids})
+        rows = self.graph.rows("nodes", ids)
+        self._record_move(ids, dragging=change.get("dragging", False))
+        position = change["position"]
+        new_x = self.graph.column("nodes", "x")[rows] + (position["x"] - x[0])
+        new_y = self.graph.column("nodes", "y")[rows] + (position["y"] - y[0])
+        self.graph.set_positions(ids, new_x, new_y)
+        self._push_changes("nodes", [
+            {"type": "position", "id": id_, "position": {"x": x_, "y": y_}}
+            for id_, x_, y_ in zip(ids, new_x.tolist(), new_y.tolist())
+        ], sync=False)
+
+    ###########################################################################
+    ## HISTORY
+    def _record_move(self, ids, dragging=False):
+        rows = self.graph.rows("nodes", ids)
+        self._history.record((
+            "move", list(ids), self.graph.column("nodes", "x")[rows],
+            self.graph.column("nodes", "y")[rows], dragging))
+
+    def _record_select(self, table, ids):
+        rows = self.graph.rows(table, ids)
+        self._history.record((
+            "select", table, list(ids),
+            self.graph.column(table, "selected")[rows]))
+
+    def _revert(self, op):
+        """ Apply the inverse operation through the editing API """
+        kind = op[0]
+        if kind == "move":
+            _, ids, x, y, _ = op
+            present = np.array([id_ in self.graph for id_ in ids], dtype=bool)
+            self.move_nodes([i for i, p in zip(ids, present) if p],
+                            x[present], y[present])
+        elif kind == "select":
+            _, table, ids, selected = op
+            update = self.update_node if table == "nodes" else self.update_edge
+            rows = self.graph._rows[table]
+            for id_, value in zip(ids, selected.tolist()):
+                if id_ in rows:
+                    update(id_, selected=value)
+        elif kind == "rename":
+            if op[1] in self.graph:
+                self.update_node(op[1], name=op[2])
+        elif kind == "weight":
+            if op[1] in self.graph._rows["edges"]:
+                self.update_edge(op[1], weight=op[2])
+        elif kind == "add":
+            self._remove_edges(op[2])
+            self._remove_nodes(op[1])
+        elif kind == "remove":
+            self._restore(op[1], op[2])
+            if len(op) > 3:
+                # removed nodes leave their groups, see _remove_nodes
+                self._groups.restore(op[3])
+
+    def _restore(self, nodes, edges):
+        """ Add back removed rows """
+        node_rows, edge_rows = self.graph.restore(nodes, edges)
+        self._history.record((
+            "add", [] if nodes is None else nodes["id"].tolist(),
+            [] if edges is None else edges["id"].tolist()))
+        self._push_changes("nodes", [
+            {"type": "add", "item": item}
+            for item in self.graph.nodes_to_reactflow(node_rows)])
+        self._push_changes("edges", [
+            {"type": "add", "item": item}
+            for item in self.graph.edges_to_reactflow(edge_rows)])
+
+    def _graph_replaced(self, event=None):
+        self._history.clear()
+        if self._log is not None:
+            self._log.save(self.graph)
+
+    ###########################################################################
+    ## PERSISTENCE
+    def _log_changes(self, nodes=(), edges=()):
+        """
+        Append change records to the autosave log, with added and replaced
+        elements as currently stored.
+        """
+        if self._log is None or not (nodes or edges):
+            return
+        self._log.append(self._log_records("nodes", nodes),
+                         self._log_records("edges", edges))
+        if self._compact_bytes is not None and \
+                self._log.log_bytes > self._compact_bytes:
+            self._log.compact(self.graph)
+
+    def _log_records(self, field, changes):
+        rows = self.graph._rows[field]
+        to_reactflow = getattr(self.graph, f"{field}_to_reactflow")
+        records = []
+        for change in changes:
+            if change["type"] in ("add", "replace"):
+                id_ = change["item"]["id"] if change["type"] == "add" \
+                    else change["id"]
+                if id_ in rows:
+                    change = {**change, "item": to_reactflow([rows[id_]])[0]}
+                elif "item" not in change:
+                    continue
+            records.append(change)
+        return records
+
+    @param.depends("history_bytes", watch=True)
+    def _update_history_bytes(self):
+        self._history.max_bytes = self.history_bytes
+
+    ###########################################################################
+    ## GENERIC WATCHERS
+    def _update_ui(self, event=None):
+        """
+        Updates both ReactFlow and Tabulator when the graph is replaced.
+        """
+        if self._batch is not None:
+            self._batch["full"] = True
+            return
+        self._apply_full(self._full_state())
+
+    def _full_state(self):
+        """ Elements and tables of the whole graph, see _apply_full """
+        return {
+            "reactflow": self._canvas_elements(),
+            "tables": {field: self._to_df(field) for field in ("nodes", "edges")},
+        }
+
+    def _apply_full(self, state):
+        with self._reactflow._measure("editor.full") as event:
+            if event is not None:
+                event.n_nodes = self.graph.n_nodes
+                event.n_edges = self.graph.n_edges
+            nodes, edges = state["reactflow"]
+            self._reactflow.nodes = nodes
+            self._reactflow.edges = edges
+            for field in ("nodes", "edges"):
                 self._updating[field] = True
                 try:
-                    d_nodes = {n.id_: n for n in self.nodes}
-                    if field == "edges":
-                        self.edges = [
-                            Edge.from_reactflow(
-                                d_nodes, e, self.new_edge_react_props)
-                            for e in event.new
-                        ]
-                    elif field == "nodes":
-                        n_new = len(event.new)
-                        n_nodes = len(self.nodes)
-                        if n_new != n_nodes:
-                            raise ValueError("reactflow event returned diff"
-                                             f"number of nodes ({n_new}) vs"
-                                             f" state ({n_nodes})")
-                        new_nodes = []
-                        for n in event.new:
-                            id_, xy, selected = Node.from_reactflow(n).values()
-                            node_to_modify = d_nodes[id_]
-                            node_to_modify.xy = xy
-                            node_to_modify.selected = selected
-                            new_nodes.append(node_to_modify)
-                        self.nodes = new_nodes
+                    df, selected = state["tables"][field]
+                    tabulator = getattr(self, f"_{field}_tabulator")
+                    tabulator.value = df
+                    if tabulator.selection != selected:
+                        tabulator.selection = selected
                 finally:
                     self._updating[field] = False
+            self._search = None
+            self._analytics = None
+            if self._query is not None:
+                self._run_search()
+            if self.lineage is not None:
+                self._show_lineage()
+
+    ###########################################################################
+    ## THREADED PROCESSING
+    def _offload(self, handler, field=None, resolve=None):
+        """
+        Wrap an event handler so that it is queued for the worker thread
+        when processing is 'thread' and the editor is served in a session.
+        Events raised by the editor patching the table of field are ignored.
+        resolve turns the event into the handler arguments on the document
+        thread, e.g. table positions into ids, as earlier queued events may
+        change the graph before the handler runs.
+        """
+        def dispatch(*args):
+            if field is not None and self._updating[field]:
+                return
+            if resolve is not None:
+                args = resolve(*args)
+            doc = pn.state.curdoc
+            if self.processing == "sync" or doc is None \
+                    or doc.session_context is None:
+                handler(*args)
+                return
+            with self._queue_lock:
+                self._queue.append((handler, args))
+                if self._draining:
+                    return
+                self._draining = True
+            _worker_pool().submit(self._drain, doc)
+        return dispatch
+
+    def _drain(self, doc):
+        """
+        Handle the queued events as one batch on the worker thread, then
+        apply the collected updates on the document thread. The next batch
+        only starts once they are applied, so the tables and the canvas
+        never lag more than one batch behind the graph.
+        """
+        try:
+            with self._queue_lock:
+                events, self._queue = self._queue, deque()
+            with self._lock:
+                events = self._merge_events(events)
+                self._batch = {
+                    "nodes": [], "edges": [], "full": False, "canvas": False}
+                try:
+                    with self._history.group():
+                        for handler, args in events:
+                            try:
+                                handler(*args)
+                            except Exception:
+                                logger.exception("Handling %s failed", handler)
+                finally:
+                    pending, self._batch = self._batch, None
+                full = self._full_state() if pending["full"] else None
+        except Exception:
+            logger.exception("Processing editor events failed")
+            pending, full = None, None
+        _on_document(doc, partial(self._apply_drained, doc, pending, full))
+
+    def _apply_drained(self, doc, pending, full):
+        try:
+            if pending is not None:
+                with self._lock:
+                    self._flush(pending, full)
+        finally:
+            with self._queue_lock:
+                if self._queue:
+                    _worker_pool().submit(self._drain, doc)
+                else:
+                    self._draining = False
+
+    def _merge_events(self, events):
+        """
+        Merge consecutive batches of canvas change records, keeping only the
+        latest record per element, and keep only the last full rebuild.
+        """
+        merged = []
+        for handler, args in events:
+            if handler == self._update_ui:
+                merged = [e for e in merged if e[0] != self._update_ui]
+            elif merged and handler == self._update_from_reactflow \
+                    and merged[-1][0] == handler:
+                previous = merged[-1][1][0]
+                args = (GraphChange(
+                    nodes=coalesce_changes(previous.nodes + args[0].nodes),
+                    edges=coalesce_changes(previous.edges + args[0].edges)),)
+                merged.pop()
+            merged.append((handler, args))
+        return merged
+
+    def _update_from_reactflow(self, change):
+        """
+        Applies the change records sent by ReactFlow (drag stop, select,
+        connect, delete) to the graph.
+        """
+        with self._reactflow._measure("editor.apply") as event:
+            if event is not None:
+                event.n_nodes = len(change.nodes)
+                event.n_edges = len(change.edges)
+            with self.batch():
+                self._apply_reactflow_change(change)
+
+    def _apply_reactflow_change(self, change):
+        graph = self.graph
+        node_changes, removed_nodes = [], []
+        for node_change in change.nodes:
+            if str(node_change.get("id")).startswith(GROUP_PREFIX):
+                self._move_aggregate(node_change)
+                continue
+            if node_change.get("id") not in graph:
+                continue
+            if node_change["type"] == "remove":
+                removed_nodes.append(node_change["id"])
+            elif node_change["type"] in ("position", "select"):
+                node_changes.append(node_change)
+        self._apply_node_changes(node_changes)
+        self._push_changes("nodes", node_changes, sync=False)
+
+        edge_changes, removed_edges = [], []
+        for edge_change in change.edges:
+            if edge_change["type"] == "add":
+                item = edge_change["item"]
+                if item["source"] not in graph or item["target"] not in graph:
+                    continue
+                weight = (item.get("data") or {}).get("weight")
+                graph.add_edges(
+                    [item["id"]], [item["source"]], [item["target"]],
+                    weights=[np.nan if weight is None else weight],
+                    selected=[item.get("selected", False)],
+                    react_props=[self.new_edge_react_props])
+                self._history.record(("add", [], [item["id"]]))
+            elif edge_change.get("id") not in graph._rows["edges"]:
+                continue
+            elif edge_change["type"] == "select":
+                self._record_select("edges", [edge_change["id"]])
+                graph.set_values("edges", "selected", [edge_change["id"]],
+                                 [edge_change["selected"]])
+            elif edge_change["type"] == "remove":
+                removed_edges.append(edge_change["id"])
+                continue
+            edge_changes.append(edge_change)
+        self._push_changes("edges", edge_changes, sync=False)
+        self._remove_edges(removed_edges, sync=False)
+        self._remove_nodes(removed_nodes, sync=False)
+
+    def _apply_node_changes(self, changes):
+        """ Write position and select records into the node columns """
+        positions = [c for c in changes if c["type"] == "position"]
+        if positions:
+            self._record_move([c["id"] for c in positions],
+                              dragging=any(c.get("dragging") for c in positions))
+            self.graph.set_positions(
+                [c["id"] for c in positions],
+                [c["position"]["x"] for c in positions],
+                [c["position"]["y"] for c in positions])
+        selections = [c for c in changes if c["type"] == "select"]
+        if selections:
+            self._record_select("nodes", [c["id"] for c in selections])
+            self.graph.set_values(
+                "nodes", "selected", [c["id"] for c in selections],
+                [c["selected"] for c in selections])
+
+    def _row_ids(self, field, positions):
+        """ Ids of the elements at the given positions of a table """
+        value = getattr(self, f"_{field}_tabulator").value
+        if field == "nodes":
+            return value["id"].iloc[list(positions)].tolist()
+        labels = value.index[list(positions)].tolist()
+        ids = {label: id_ for id_, label in self._rows[field].items()}
+        return [ids[label] for label in labels]
+
+    def _cell_ids(self, field):
+        """ Resolve the row of a cell event to the id of its element """
+        return lambda event: (event, self._row_ids(field, [event.row])[0])
+
+    def _selection_ids(self, field):
+        """ Resolve the selected positions of a table to ids """
+        return lambda event: (self._row_ids(field, event.new),)
 
     def _update_selection_from_tabulator(self, field):
         """Updates node selection state when rows are selected in Tabulator."""
-        def fun(event):
+        def fun(ids):
             if self._updating[field]:
                 return
-            try:
-                selected_indices = set(event.new)
-                for i, entry in enumerate(getattr(self, field)):
-                    entry.selected = i in selected_indices
-                setattr(self, field, getattr(self, field))
-            finally:
-                self._updating[field] = False
+            current = self.graph.column(field, "selected")
+            selected = np.zeros(len(current), dtype=bool)
+            rows = self.graph._rows[field]
+            # elements removed since the selection are ignored
+            selected[[rows[id_] for id_ in ids if id_ in rows]] = True
+            changed = np.flatnonzero(selected != current)
+            if not len(changed):
+                return
+            self._history.record((
+                "select", field, self.graph.ids(field)[changed].tolist(),
+                current[changed]))
+            current[changed] = selected[changed]
+            self._push_changes(field, [
+                {"type": "select", "id": id_, "selected": bool(value)}
+                for id_, value in zip(self.graph.ids(field)[changed],
+                                      selected[changed])
+            ])
         return fun
 
     def _handle_tabulator_delete(self, field):
-        def fun(event):
+        def fun(event, id_):
             if event.column == "delete":
-                field_values = getattr(self, field)
-                setattr(self, field,
-                        field_values[:event.row] + field_values[event.row+1:])
-                if field == "nodes":
-                    field_value = field_values[event.row]
-                    self.edges = [
-                        e for e in self.edges
-                        if field_value.id_ not in [e.target.id_, e.source.id_]
-                    ]
+                getattr(self, f"_remove_{field}")([id_])
         return fun
 
+    def _remove_nodes(self, ids, sync=True):
+        """
+        Removes nodes together with their edges, the edges are looked up in
+        the adjacency index rather than by scanning all edges.
+        """
+        ids = [id_ for id_ in ids if id_ in self.graph]
+        if not ids:
+            return
+        edge_ids = list(dict.fromkeys(
+            e for id_ in ids
+            for e in self.graph.in_edge_ids(id_) + self.graph.out_edge_ids(id_)))
+        groups = self._groups.discard(ids)
+        self._history.record((
+            "remove", self.graph.snapshot("nodes", ids),
+            self.graph.snapshot("edges", edge_ids), groups))
+        edge_ids = self.graph.remove_nodes(ids)
+        with self.batch():
+            self._push_changes(
+                "edges", [{"type": "remove", "id": id_} for id_ in edge_ids],
+                sync=sync)
+            self._push_changes(
+                "nodes", [{"type": "remove", "id": id_} for id_ in ids],
+                sync=sync)
+
+    def _remove_edges(self, ids, sync=True):
+        """ Removes edges and drops them from the adjacency index """
+        ids = [id_ for id_ in ids if id_ in self.graph._rows["edges"]]
+        if not ids:
+            return
+        self._history.record(
+            ("remove", None, self.graph.snapshot("edges", ids)))
+        ids = self.graph.remove_edges(ids)
+        self._push_changes(
+            "edges", [{"type": "remove", "id": id_} for id_ in ids],
+            sync=sync)
+
     ###########################################################################
     ## NODE WATCHERS
-    def _update_nodes_from_tabulator_edit(self, event):
+    def _update_nodes_from_tabulator_edit(self, event, id_):
         """ Update nodes based on name updating of a node """
         if self._updating["nodes"]:
             return
-        self._updating["nodes"] = True
-        try:
-            node_to_update = self.nodes[event.row]
-            if event.column == "name":
-                node_to_update.name = event.value
-                self.nodes = self.nodes[:] # Trigger update
-        finally:
-            self._updating["nodes"] = False
+        if event.column == "name" and id_ in self.graph:
+            self.update_node(id_, name=event.value)
 
     def _add_node(self, event):
-        new_node = Node(
-            id_=str(uuid.uuid4()),
-            name=self._add_node_name.value,
-            xy = (0, 0),
-            selected = False,
-            react_props=self.new_node_react_props,
-        )
-        self.nodes = self.nodes + [new_node]
+        self.add_node(name=self._add_node_name.value)
 
     ###########################################################################
     ## EDGE WATCHERS
-    def _update_edges_from_tabulator_edit(self, event):
+    def _update_edges_from_tabulator_edit(self, event, id_):
         """ Update edges based on weight updating of a edge """
         if self._updating["edges"]:
             return
-        self._updating["edges"] = True
-        try:
-            edge_to_update = self.edges[event.row]
-            if event.column == "weight":
-                edge_to_update.weight = event.value
-                self.edges = self.edges
-        finally:
-            self._updating["edges"] = False
+        if event.column == "weight" and id_ in self.graph._rows["edges"]:
+            self.update_edge(id_, weight=event.value)
 
     ###########################################################################
     ## LAYOUT
@@ -414,7 +2195,7 @@ class ReactFlowEditor(pn.custom.PyComponent):
         """Creates the component's visible layout."""
         controls = pn.Card(
             pn.Row(self._add_node_name, self._add_node_button),
-            title="<i class='fa-solid fa-plus'></i> Add Node",
+            title=f"{_ICONS['plus']} Add Node",
             sizing_mode="stretch_width"
         )
 
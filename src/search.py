@@ -0,0 +1,142 @@
+"""
+Inverted index over the text of the nodes and edges of a GraphStore, for
+word prefix search. Node documents are their id, name and the scalar values
+of their react_props; edge documents their id, the ids and names of their
+ends and the scalar values of their react_props.
+
+Terms are kept sorted, so the terms starting with a prefix are a contiguous
+range found by bisection. The index is updated per element from React Flow
+change records (see ReactFlowEditor).
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+import re
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """ Lower case words of a text """
+    return _WORD.findall(str(text).lower())
+
+
+def _scalars(value):
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from _scalars(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _scalars(v)
+    elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        yield value
+
+
+def node_documents(store, ids):
+    """ Terms of the given nodes """
+    rows = store.rows("nodes", ids)
+    names = store.column("nodes", "name")[rows]
+    props = store.column("nodes", "react_props")[rows]
+    return [
+        {t for text in (id_, name, *_scalars(p)) for t in tokenize(text)}
+        for id_, name, p in zip(ids, names, props)]
+
+
+def edge_documents(store, ids):
+    """ Terms of the given edges """
+    rows = store.rows("edges", ids)
+    node_ids = store.ids("nodes")
+    names = store.column("nodes", "name")
+    sources = store.column("edges", "source")[rows]
+    targets = store.column("edges", "target")[rows]
+    props = store.column("edges", "react_props")[rows]
+    return [
+        {t for text in (id_, node_ids[s], names[s], node_ids[t_], names[t_],
+                        *_scalars(p))
+         for t in tokenize(text)}
+        for id_, s, t_, p in zip(ids, sources, targets, props)]
+
+
+class SearchIndex:
+    """ Per table inverted index: term -> ids, with the terms sorted """
+
+    def __init__(self):
+        self._postings = {"nodes": defaultdict(dict), "edges": defaultdict(dict)}
+        self._terms = {"nodes": [], "edges": []}
+        self._documents = {"nodes": {}, "edges": {}}
+
+    @classmethod
+    def from_store(cls, store):
+        index = cls()
+        for table, documents in (("nodes", node_documents),
+                                 ("edges", edge_documents)):
+            ids = store.ids(table).tolist()
+            postings = index._postings[table]
+            for id_, terms in zip(ids, documents(store, ids)):
+                index._documents[table][id_] = terms
+                for term in terms:
+                    postings[term][id_] = None
+            index._terms[table] = sorted(postings)
+        return index
+
+    def update(self, store, table, changes):
+        """ Reindex the elements added, replaced or removed by records """
+        removed, changed = [], []
+        for change in changes:
+            if change["type"] == "remove":
+                removed.append(change["id"])
+            elif change["type"] in ("add", "replace"):
+                changed.append(change["item"]["id"] if change["type"] == "add"
+                               else change["id"])
+        self.remove(table, removed)
+        changed = [id_ for id_ in dict.fromkeys(changed)
+                   if id_ in store._rows[table]]
+        if changed:
+            documents = node_documents if table == "nodes" else edge_documents
+            self.add(table, changed, documents(store, changed))
+
+    def add(self, table, ids, documents):
+        """ Index documents (sets of terms), replacing the previous ones """
+        self.remove(table, ids)
+        postings, terms = self._postings[table], self._terms[table]
+        for id_, document in zip(ids, documents):
+            self._documents[table][id_] = document
+            for term in document:
+                if term not in postings:
+                    insort(terms, term)
+                postings[term][id_] = None
+
+    def remove(self, table, ids):
+        postings, terms = self._postings[table], self._terms[table]
+        for id_ in ids:
+            for term in self._documents[table].pop(id_, ()):
+                posting = postings[term]
+                posting.pop(id_, None)
+                if not posting:
+                    del postings[term]
+                    del terms[bisect_left(terms, term)]
+
+    def search(self, table, query, prefix=True):
+        """
+        Ids of the elements having, for every word of the query, a term
+        starting with it (or equal to it without prefix). An empty query
+        matches nothing.
+        """
+        words = tokenize(query)
+        if not words:
+            return set()
+        postings, terms = self._postings[table], self._terms[table]
+        result = None
+        # the longest words are the most selective
+        for word in sorted(words, key=len, reverse=True):
+            if prefix:
+                matches = set()
+                for i in range(bisect_left(terms, word), len(terms)):
+                    if not terms[i].startswith(word):
+                        break
+                    matches.update(postings[terms[i]])
+            else:
+                matches = set(postings.get(word, ()))
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
@@ -0,0 +1,125 @@
+"""
+A graph document shared by the ReactFlowComponents of many sessions, e.g.
+all the viewers of a dashboard under `panel serve`.
+
+The node and edge lists and the pane factories are held once by the
+document; attached components reference them instead of holding copies.
+A change is applied once and the same change message is sent to every
+attached component. Selection and viewport stay per session: select
+records from a browser only update the selection of its component.
+
+>>> graph = SharedGraph(nodes=nodes, edges=edges)  # at module level
+>>> graph.component(height=600).servable()          # in each session
+"""
+from functools import partial
+import threading
+
+import panel as pn
+
+from .reactflow import ReactFlowComponent, _on_document
+
+
+class SharedGraph:
+    """ Server-wide node and edge document fanned out to many sessions """
+
+    def __init__(self, nodes=(), edges=(), **params):
+        # component holding the shared state, it is never rendered and
+        # creates no panes, its messages go to the attached components
+        params.setdefault("lazy_panes", True)
+        self._master = ReactFlowComponent(
+            nodes=list(nodes), edges=list(edges), **params)
+        self._master._send_msg = self._broadcast
+        self._lock = threading.RLock()
+        self._subscribers = {}
+
+    @property
+    def nodes(self):
+        return self._master.nodes
+
+    @nodes.setter
+    def nodes(self, value):
+        with self._lock:
+            self._master.nodes = value
+            self._resync()
+
+    @property
+    def edges(self):
+        return self._master.edges
+
+    @edges.setter
+    def edges(self, value):
+        with self._lock:
+            self._master.edges = value
+            self._resync()
+
+    def component(self, **params):
+        """ A ReactFlowComponent of the current session showing the graph """
+        component = ReactFlowComponent(**params)
+        self.attach(component)
+        return component
+
+    def attach(self, component):
+        """
+        Show the graph in a component of the current session, it is detached
+        again when the session is destroyed.
+        """
+        doc = pn.state.curdoc
+        with self._lock:
+            self._subscribers[id(component)] = (component, doc)
+            component._attach_shared(self)
+        if doc is not None and doc.session_context is not None:
+            doc.on_session_destroyed(lambda context: self.detach(component))
+
+    def detach(self, component):
+        """ Give the component its own copy of the graph again """
+        with self._lock:
+            if self._subscribers.pop(id(component), None) is not None:
+                component._detach_shared()
+
+    @property
+    def n_sessions(self):
+        return len(self._subscribers)
+
+    ###########################################################################
+    ## Changes
+    ###########################################################################
+    def apply_changes(self, nodes=None, edges=None):
+        """ Apply change records and send them to all sessions """
+        with self._lock:
+            self._master.apply_changes(nodes=nodes, edges=edges)
+
+    def stream(self, nodes=None, edges=None, rollover=None):
+        """ See ReactFlowComponent.stream """
+        with self._lock:
+            self._master.stream(nodes=nodes, edges=edges, rollover=rollover)
+
+    def patch(self, nodes=None, edges=None):
+        """ See ReactFlowComponent.patch """
+        with self._lock:
+            self._master.patch(nodes=nodes, edges=edges)
+
+    def _receive(self, change, origin):
+        """ Apply the records of a session and forward them to the others """
+        with self._lock:
+            master = self._master
+            master._apply_changes("reactflow_nodes", change.nodes)
+            master._apply_changes("edges", change.edges)
+            master._update_pane_sources(
+                removed=master._removed_ids(change.nodes))
+            if change.nodes or change.edges:
+                self._broadcast({
+                    "type": "changes",
+                    "nodes": master._strip_changes(
+                        change.nodes, master.default_node_options),
+                    "edges": master._strip_changes(
+                        change.edges, master.default_edge_options),
+                }, exclude=origin)
+
+    def _broadcast(self, message, exclude=None):
+        for component, doc in list(self._subscribers.values()):
+            if component is not exclude:
+                _on_document(doc, partial(component._receive_shared, message))
+
+    def _resync(self):
+        for component, doc in list(self._subscribers.values()):
+            _on_document(doc, component._sync_shared)
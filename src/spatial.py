@@ -0,0 +1,166 @@
+"""
+Uniform grid index over the node positions of a GraphStore. Nodes are kept
+in the cell holding their position and moved between cells when they move,
+so box, nearest node and overlap queries only look at the cells around the
+query instead of scanning all nodes.
+"""
+from collections import defaultdict
+import math
+
+import numpy as np
+
+
+class GridIndex:
+    """
+    Node ids bucketed by grid cell. positions(ids) returns the x and y
+    arrays of the given ids, candidates found in the cells are checked
+    against their exact positions.
+    """
+
+    def __init__(self, positions, cell_size=250.):
+        self.cell_size = float(cell_size)
+        self._positions = positions
+        self._cells = defaultdict(dict)
+        self._cell_of = {}
+        # cells spanned by the nodes, only grows so it bounds the searches
+        self._bounds = None
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def _cells_of(self, x, y):
+        s = self.cell_size
+        x = np.nan_to_num(np.asarray(x, dtype=np.float64))
+        y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+        return zip(np.floor(x / s).astype(np.int64).tolist(),
+                   np.floor(y / s).astype(np.int64).tolist())
+
+    def insert(self, ids, x, y):
+        """ Add nodes, or move them to the cell of their new position """
+        cells, cell_of = self._cells, self._cell_of
+        new = list(self._cells_of(x, y))
+        if new:
+            i, j = zip(*new)
+            bounds = self._bounds or (min(i), min(j), max(i), max(j))
+            self._bounds = (min(bounds[0], min(i)), min(bounds[1], min(j)),
+                            max(bounds[2], max(i)), max(bounds[3], max(j)))
+        for id_, cell in zip(ids, new):
+            old = cell_of.get(id_)
+            if old == cell:
+                continue
+            if old is not None:
+                self._discard(old, id_)
+            cells[cell][id_] = None
+            cell_of[id_] = cell
+
+    move = insert
+
+    def remove(self, ids):
+        for id_ in ids:
+            cell = self._cell_of.pop(id_, None)
+            if cell is not None:
+                self._discard(cell, id_)
+
+    def _discard(self, cell, id_):
+        members = self._cells[cell]
+        del members[id_]
+        if not members:
+            del self._cells[cell]
+
+    ###########################################################################
+    ## Queries
+    ###########################################################################
+    def _span(self, x0, y0, x1, y1):
+        s = self.cell_size
+        return (math.floor(min(x0, x1) / s), math.floor(min(y0, y1) / s),
+                math.floor(max(x0, x1) / s), math.floor(max(y0, y1) / s))
+
+    def candidates(self, x0, y0, x1, y1):
+        """ Ids in the cells overlapping the box """
+        i0, j0, i1, j1 = self._span(x0, y0, x1, y1)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            # box larger than the occupied area, visit the occupied cells
+            cells = [c for c in self._cells
+                     if i0 <= c[0] <= i1 and j0 <= c[1] <= j1]
+        else:
+            cells = [(i, j) for i in range(i0, i1 + 1)
+                     for j in range(j0, j1 + 1) if (i, j) in self._cells]
+        return [id_ for cell in cells for id_ in self._cells[cell]]
+
+    def box(self, x0, y0, x1, y1):
+        """ Ids of the nodes positioned inside the box (bounds included) """
+        ids = self.candidates(x0, y0, x1, y1)
+        if not ids:
+            return []
+        x, y = self._positions(ids)
+        inside = ((x >= min(x0, x1)) & (x <= max(x0, x1))
+                  & (y >= min(y0, y1)) & (y <= max(y0, y1)))
+        return [id_ for id_, keep in zip(ids, inside.tolist()) if keep]
+
+    def nearest(self, x, y, k=1):
+        """
+        Ids of the k nodes closest to the point with their distances, closest
+        first. Rings of cells around the point are searched until no closer
+        node can remain outside of them.
+        """
+        if not self._cell_of or k < 1:
+            return [], np.empty(0)
+        s = self.cell_size
+        ci, cj = math.floor(x / s), math.floor(y / s)
+        i0, j0, i1, j1 = self._bounds
+        reach = max(ci - i0, i1 - ci, cj - j0, j1 - cj)
+        ids = []
+        for r in range(reach + 1):
+            ids.extend(self._ring(ci, cj, r))
+            if len(ids) < k:
+                continue
+            distance = self._distances(ids, x, y)
+            # nodes outside the searched square are at least r cells away
+            if np.partition(distance, k - 1)[k - 1] <= r * s:
+                break
+        distance = self._distances(ids, x, y)
+        order = np.argsort(distance, kind="stable")[:k]
+        return [ids[i] for i in order.tolist()], distance[order]
+
+    def _ring(self, ci, cj, r):
+        if r == 0:
+            cells = [(ci, cj)]
+        else:
+            cells = [(ci + i, cj + j) for i in range(-r, r + 1)
+                     for j in (-r, r)]
+            cells += [(ci + i, cj + j) for i in (-r, r)
+                      for j in range(-r + 1, r)]
+        return [id_ for cell in cells if cell in self._cells
+                for id_ in self._cells[cell]]
+
+    def _distances(self, ids, x, y):
+        xs, ys = self._positions(ids)
+        return np.hypot(xs - x, ys - y)
+
+    def overlaps(self, width, height):
+        """
+        Pairs of ids of nodes whose boxes of the given size, anchored at
+        their position, overlap.
+        """
+        s = self.cell_size
+        di, dj = math.ceil(width / s), math.ceil(height / s)
+        pairs = []
+        for (i, j), members in self._cells.items():
+            ids = list(members)
+            # neighbours in the cells to the right, or in the same column
+            # below, so each pair of cells is compared once
+            others = [id_ for a in range(i, i + di + 1)
+                      for b in range(j - dj, j + dj + 1)
+                      if (a > i or b > j) and (a, b) in self._cells
+                      for id_ in self._cells[(a, b)]]
+            x, y = self._positions(ids + others)
+            n = len(ids)
+            dx = np.abs(x[:n, None] - x[None, :])
+            dy = np.abs(y[:n, None] - y[None, :])
+            hit = (dx < width) & (dy < height)
+            # within the cell keep each pair once
+            hit[:, :n] &= np.triu(np.ones((n, n), dtype=bool), 1)
+            all_ids = ids + others
+            pairs.extend((ids[a], all_ids[b])
+                         for a, b in zip(*np.nonzero(hit)))
+        return pairs
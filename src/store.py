@@ -0,0 +1,812 @@
+from collections import defaultdict
+import json
+
+import numpy as np
+import pandas as pd
+
+from .spatial import GridIndex
+
+
+NODE_COLUMNS = {
+    "id": object,
+    "x": np.float64,
+    "y": np.float64,
+    "name": object,
+    "selected": np.bool_,
+    "react_props": object,
+}
+
+EDGE_COLUMNS = {
+    "id": object,
+    "source": np.int64,
+    "target": np.int64,
+    "weight": np.float64,
+    "selected": np.bool_,
+    "react_props": object,
+}
+
+
+# keys of a React Flow element that are stored in columns or added by the
+# components, the rest are kept as react_props
+_NODE_KEYS = {"id", "position", "data", "selected", "type"}
+_EDGE_KEYS = {"id", "source", "target", "data", "selected"}
+
+
+def _node_fields(item):
+    """ id, x, y, name, selected and react_props of a React Flow node """
+    position = item.get("position") or {}
+    data = item.get("data") or {}
+    props = {k: v for k, v in item.items() if k not in _NODE_KEYS}
+    return (item["id"], position.get("x", 0.), position.get("y", 0.),
+            data.get("label", ""), bool(item.get("selected", False)), props)
+
+
+def _edge_fields(item):
+    """ id, source, target, weight, selected and react_props of an edge """
+    weight = (item.get("data") or {}).get("weight")
+    props = {k: v for k, v in item.items() if k not in _EDGE_KEYS}
+    return (item["id"], item["source"], item["target"],
+            np.nan if weight is None else weight,
+            bool(item.get("selected", False)), props)
+
+
+def _to_pandas(table):
+    """ Accept DataFrames and tables with a to_pandas method (e.g. Arrow) """
+    if table is None or isinstance(table, pd.DataFrame):
+        return table
+    if hasattr(table, "to_pandas"):
+        return table.to_pandas()
+    return pd.DataFrame(table)
+
+
+class NodeRow:
+    """
+    Lightweight proxy for a node in a GraphStore, it mimics the Node
+    interface (id_, xy, name, selected, react_props) without holding any data.
+    """
+    __slots__ = ("_store", "id_")
+
+    def __init__(self, store, id_):
+        self._store = store
+        self.id_ = id_
+
+    def __repr__(self):
+        return f"NodeRow({self.id_!r})"
+
+    def __eq__(self, other):
+        return (isinstance(other, NodeRow) and other._store is self._store
+                and other.id_ == self.id_)
+
+    def __hash__(self):
+        return hash(self.id_)
+
+    @property
+    def row(self):
+        return self._store._rows["nodes"][self.id_]
+
+    def _get(self, column):
+        return self._store._columns["nodes"][column][self.row]
+
+    def _set(self, column, value):
+        self._store._columns["nodes"][column][self.row] = value
+
+    @property
+    def xy(self):
+        row = self.row
+        columns = self._store._columns["nodes"]
+        return (float(columns["x"][row]), float(columns["y"][row]))
+
+    @xy.setter
+    def xy(self, value):
+        self._store.set_positions([self.id_], [value[0]], [value[1]])
+
+    name = property(lambda self: self._get("name"),
+                    lambda self, value: self._set("name", value))
+    selected = property(lambda self: bool(self._get("selected")),
+                        lambda self, value: self._set("selected", value))
+    react_props = property(
+        lambda self: self._get("react_props"),
+        lambda self, value: self._set(
+            "react_props", self._store.intern_props(value)))
+
+    def to_reactflow(self):
+        return self._store.nodes_to_reactflow([self.row])[0]
+
+    def to_tabular(self):
+        return self._store.nodes_to_tabular([self.row]).iloc[0].to_dict()
+
+
+class EdgeRow:
+    """
+    Lightweight proxy for an edge in a GraphStore, it mimics the Edge
+    interface (id_, source, target, weight, selected, react_props).
+    """
+    __slots__ = ("_store", "id_")
+
+    def __init__(self, store, id_):
+        self._store = store
+        self.id_ = id_
+
+    def __repr__(self):
+        return f"EdgeRow({self.id_!r})"
+
+    def __eq__(self, other):
+        return (isinstance(other, EdgeRow) and other._store is self._store
+                and other.id_ == self.id_)
+
+    def __hash__(self):
+        return hash(self.id_)
+
+    @property
+    def row(self):
+        return self._store._rows["edges"][self.id_]
+
+    def _get(self, column):
+        return self._store._columns["edges"][column][self.row]
+
+    def _set(self, column, value):
+        self._store._columns["edges"][column][self.row] = value
+
+    @property
+    def source(self):
+        return self._store.nodes[int(self._get("source"))]
+
+    @property
+    def target(self):
+        return self._store.nodes[int(self._get("target"))]
+
+    @property
+    def weight(self):
+        weight = self._get("weight")
+        return None if np.isnan(weight) else float(weight)
+
+    @weight.setter
+    def weight(self, value):
+        self._set("weight", np.nan if value is None else value)
+
+    selected = property(lambda self: bool(self._get("selected")),
+                        lambda self, value: self._set("selected", value))
+    react_props = property(
+        lambda self: self._get("react_props"),
+        lambda self, value: self._set(
+            "react_props", self._store.intern_props(value)))
+
+    def to_reactflow(self):
+        return self._store.edges_to_reactflow([self.row])[0]
+
+    def to_tabular(self):
+        return self._store.edges_to_tabular([self.row]).iloc[0].to_dict()
+
+
+class RowView:
+    """ Read-only sequence of row proxies over one table of a GraphStore """
+
+    def __init__(self, store, table, row_cls):
+        self._store = store
+        self._table = table
+        self._row_cls = row_cls
+
+    def __len__(self):
+        return self._store._size[self._table]
+
+    def __getitem__(self, i):
+        ids = self._store.ids(self._table)
+        if isinstance(i, slice):
+            return [self._row_cls(self._store, id_) for id_ in ids[i]]
+        return self._row_cls(self._store, ids[i])
+
+    def __iter__(self):
+        for id_ in self._store.ids(self._table):
+            yield self._row_cls(self._store, id_)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._table}, n={len(self)})"
+
+
+class GraphStore:
+    """
+    Columnar storage for the nodes and edges of a graph. Node and edge
+    attributes live in NumPy arrays, edges reference their source and target
+    by node row, and NodeRow/EdgeRow proxies give per-element access without
+    allocating a param.Parameterized object per element.
+
+    Rows keep their insertion order, removals compact the arrays.
+    """
+
+    def __init__(self):
+        self._columns = {
+            "nodes": {k: np.empty(0, dtype=v) for k, v in NODE_COLUMNS.items()},
+            "edges": {k: np.empty(0, dtype=v) for k, v in EDGE_COLUMNS.items()},
+        }
+        self._size = {"nodes": 0, "edges": 0}
+        self._rows = {"nodes": {}, "edges": {}}
+        self._adjacency = None
+        self._spatial = None
+        self._interned = {}
+        self.nodes = RowView(self, "nodes", NodeRow)
+        self.edges = RowView(self, "edges", EdgeRow)
+
+    ###########################################################################
+    ## Constructors
+    ###########################################################################
+    @classmethod
+    def from_elements(cls, nodes=(), edges=()):
+        """ Build a store from Node and Edge objects """
+        store = cls()
+        store.add_nodes(
+            ids=[n.id_ for n in nodes],
+            x=[n.xy[0] for n in nodes],
+            y=[n.xy[1] for n in nodes],
+            names=[n.name for n in nodes],
+            selected=[n.selected for n in nodes],
+            react_props=[n.react_props for n in nodes],
+        )
+        store.add_edges(
+            ids=[e.id_ for e in edges],
+            sources=[e.source.id_ for e in edges],
+            targets=[e.target.id_ for e in edges],
+            weights=[np.nan if e.weight is None else e.weight for e in edges],
+            selected=[e.selected for e in edges],
+            react_props=[e.react_props for e in edges],
+        )
+        return store
+
+    @classmethod
+    def from_reactflow(cls, nodes=(), edges=()):
+        """ Build a store from React Flow node and edge dicts """
+        store = cls()
+        store._add_items("nodes", nodes)
+        store._add_items("edges", edges)
+        return store
+
+    @classmethod
+    def from_columns(cls, nodes, edges):
+        """
+        Build a store around existing column arrays (e.g. memory-mapped),
+        edges reference their source and target by node row. The arrays are
+        used as they are and only copied once the store grows.
+        """
+        store = cls()
+        for table, columns in (("nodes", nodes), ("edges", edges)):
+            store._columns[table] = dict(columns)
+            store._size[table] = len(columns["id"])
+            store._rows[table] = dict(zip(
+                columns["id"].tolist(), range(len(columns["id"]))))
+        return store
+
+    @classmethod
+    def from_dataframes(cls, nodes=None, edges=None, node_columns=None,
+                        edge_columns=None):
+        """
+        Build a store from node and edge tables (pandas DataFrames or
+        anything with a to_pandas method, e.g. Arrow tables).
+
+        node_columns and edge_columns map the store fields to the column
+        names of the tables, e.g. {"id": "node_id", "name": "label"}.
+        Node fields are id, x, y, name, selected and react_props, edge
+        fields id, source, target, weight, selected and react_props. Only id
+        (source and target for edges) is required: positions default to 0,
+        names to the id and edge ids to "source -> target". Without a node
+        table the nodes are the edge endpoints.
+        """
+        store = cls()
+        edges = _to_pandas(edges)
+        edge_columns = {**{k: k for k in EDGE_COLUMNS}, **(edge_columns or {})}
+        if edges is not None:
+            sources = edges[edge_columns["source"]].astype(str)
+            targets = edges[edge_columns["target"]].astype(str)
+        if nodes is None:
+            ids = pd.unique(pd.concat([sources, targets])) if edges is not None \
+                else np.empty(0, dtype=object)
+            nodes = pd.DataFrame({"id": ids})
+            node_columns = None
+        nodes = _to_pandas(nodes)
+        node_columns = {**{k: k for k in NODE_COLUMNS}, **(node_columns or {})}
+
+        def get(table, columns, field, default=None):
+            name = columns[field]
+            if name in table.columns:
+                return table[name].to_numpy()
+            return default
+
+        ids = nodes[node_columns["id"]].astype(str).to_numpy(dtype=object)
+        n = len(ids)
+        store.add_nodes(
+            ids,
+            x=get(nodes, node_columns, "x", np.zeros(n)),
+            y=get(nodes, node_columns, "y", np.zeros(n)),
+            names=get(nodes, node_columns, "name", ids),
+            selected=get(nodes, node_columns, "selected"),
+            react_props=get(nodes, node_columns, "react_props"),
+        )
+        if edges is not None:
+            ids = get(edges, edge_columns, "id")
+            store.add_edges(
+                (sources + " -> " + targets).to_numpy(dtype=object)
+                if ids is None else ids.astype(str).astype(object),
+                sources.to_numpy(), targets.to_numpy(),
+                weights=get(edges, edge_columns, "weight"),
+                selected=get(edges, edge_columns, "selected"),
+                react_props=get(edges, edge_columns, "react_props"),
+            )
+        return store
+
+    @classmethod
+    def from_networkx(cls, graph, x="x", y="y", name="name", weight="weight"):
+        """
+        Build a store from a networkx graph, node positions, names and edge
+        weights are read from the given node and edge attributes. Edge keys
+        of multigraphs are used as edge ids.
+        """
+        nodes = pd.DataFrame([
+            {"id": str(id_), "x": data.get(x, 0.), "y": data.get(y, 0.),
+             "name": data.get(name, str(id_))}
+            for id_, data in graph.nodes(data=True)
+        ], columns=["id", "x", "y", "name"])
+        if graph.is_multigraph():
+            edges = pd.DataFrame([
+                {"id": str(key), "source": str(u), "target": str(v),
+                 "weight": data.get(weight, np.nan)}
+                for u, v, key, data in graph.edges(keys=True, data=True)
+            ], columns=["id", "source", "target", "weight"])
+        else:
+            edges = pd.DataFrame([
+                {"source": str(u), "target": str(v),
+                 "weight": data.get(weight, np.nan)}
+                for u, v, data in graph.edges(data=True)
+            ], columns=["source", "target", "weight"])
+        return cls.from_dataframes(nodes, edges)
+
+    ###########################################################################
+    ## Export
+    ###########################################################################
+    def to_dataframes(self):
+        """
+        Node and edge DataFrames with the columns accepted by
+        from_dataframes, edges reference their nodes by id.
+        """
+        nodes = self._take("nodes", None)
+        edges = self._take("edges", None)
+        node_ids = self.ids("nodes")
+        edges["source"] = node_ids[edges["source"]]
+        edges["target"] = node_ids[edges["target"]]
+        return pd.DataFrame(nodes), pd.DataFrame(edges)
+
+    def to_arrow(self):
+        """ Node and edge Arrow tables, react_props are left out """
+        import pyarrow as pa
+        nodes, edges = self.to_dataframes()
+        return (pa.Table.from_pandas(nodes.drop(columns="react_props")),
+                pa.Table.from_pandas(edges.drop(columns="react_props")))
+
+    def to_networkx(self, x="x", y="y", name="name", weight="weight"):
+        """
+        A networkx MultiDiGraph keyed by edge id, holding the positions,
+        names and (non missing) weights as attributes.
+        """
+        import networkx as nx
+        graph = nx.MultiDiGraph()
+        nodes, edges = self.to_dataframes()
+        graph.add_nodes_from(
+            (id_, {x: x_, y: y_, name: name_}) for id_, x_, y_, name_ in zip(
+                nodes["id"], nodes["x"].tolist(), nodes["y"].tolist(),
+                nodes["name"]))
+        graph.add_edges_from(
+            (source, target, id_, {} if w != w else {weight: w})
+            for id_, source, target, w in zip(
+                edges["id"], edges["source"], edges["target"],
+                edges["weight"].tolist()))
+        return graph
+
+    ###########################################################################
+    ## Basic accessors
+    ###########################################################################
+    @property
+    def n_nodes(self):
+        return self._size["nodes"]
+
+    @property
+    def n_edges(self):
+        return self._size["edges"]
+
+    def column(self, table, name):
+        """ The live (not copied) array of a column, trimmed to the size """
+        return self._columns[table][name][:self._size[table]]
+
+    def ids(self, table):
+        return self.column(table, "id")
+
+    def rows(self, table, ids):
+        """ Row positions of the given ids """
+        rows = self._rows[table]
+        return np.array([rows[id_] for id_ in ids], dtype=np.int64)
+
+    def __contains__(self, id_):
+        return id_ in self._rows["nodes"]
+
+    def node(self, id_):
+        if id_ not in self._rows["nodes"]:
+            raise KeyError(id_)
+        return NodeRow(self, id_)
+
+    def edge(self, id_):
+        if id_ not in self._rows["edges"]:
+            raise KeyError(id_)
+        return EdgeRow(self, id_)
+
+    ###########################################################################
+    ## Mutation
+    ###########################################################################
+    def _append(self, table, values):
+        rows = self._rows[table]
+        ids = list(values["id"])
+        # check before writing, a failed append leaves the store unchanged
+        seen = set()
+        for id_ in ids:
+            if id_ in rows or id_ in seen:
+                raise ValueError(f"Duplicate {table[:-1]} id {id_!r}")
+            seen.add(id_)
+        columns = self._columns[table]
+        size = self._size[table]
+        n = len(ids)
+        if size + n > len(columns["id"]):
+            capacity = max(2 * len(columns["id"]), size + n, 16)
+            for name, array in columns.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:size] = array[:size]
+                columns[name] = grown
+        for name, array in columns.items():
+            array[size:size + n] = values[name]
+        rows.update(zip(ids, range(size, size + n)))
+        self._size[table] = size + n
+        return np.arange(size, size + n)
+
+    def intern_props(self, props):
+        """
+        Return a shared dict equal to props, so elements with the same
+        react_props hold a single dict rather than one copy each. Interned
+        dicts are shared, replace rather than mutate them.
+        """
+        if not props:
+            props = {}
+        try:
+            key = json.dumps(props, sort_keys=True)
+        except TypeError:
+            return props
+        return self._interned.setdefault(key, props)
+
+    def _props_array(self, values, n):
+        empty = self.intern_props({})
+        if values is None:
+            return self._object_array([empty] * n, n)
+        # elements often share the same dict object, intern each one once
+        seen = {}
+        interned = []
+        for props in values:
+            if not props:
+                interned.append(empty)
+                continue
+            key = id(props)
+            if key not in seen:
+                seen[key] = (props, self.intern_props(props))
+            interned.append(seen[key][1])
+        return self._object_array(interned, n)
+
+    @staticmethod
+    def _object_array(values, n, default=None):
+        array = np.empty(n, dtype=object)
+        if values is None:
+            array[:] = [default() if callable(default) else default] * n
+        else:
+            array[:] = list(values)
+        return array
+
+    def add_nodes(self, ids, x, y, names=None, selected=None,
+                  react_props=None):
+        """ Append nodes, returns their rows """
+        n = len(ids)
+        rows = self._append("nodes", {
+            "id": self._object_array(ids, n),
+            "x": np.asarray(x, dtype=np.float64),
+            "y": np.asarray(y, dtype=np.float64),
+            "name": self._object_array(names, n, ""),
+            "selected": False if selected is None else np.asarray(selected),
+            "react_props": self._props_array(react_props, n),
+        })
+        if self._spatial is not None:
+            self._spatial.insert(ids, self._columns["nodes"]["x"][rows],
+                                 self._columns["nodes"]["y"][rows])
+        return rows
+
+    def add_edges(self, ids, sources, targets, weights=None, selected=None,
+                  react_props=None):
+        """
+        Append edges given source and target node ids, returns their rows
+        """
+        n = len(ids)
+        sources = self.rows("nodes", sources)
+        targets = self.rows("nodes", targets)
+        rows = self._append("edges", {
+            "id": self._object_array(ids, n),
+            "source": sources,
+            "target": targets,
+            "weight": np.nan if weights is None else
+                np.asarray(weights, dtype=np.float64),
+            "selected": False if selected is None else np.asarray(selected),
+            "react_props": self._props_array(react_props, n),
+        })
+        if self._adjacency is not None:
+            self._index_edges(rows)
+        return rows
+
+    def _compact(self, table, rows):
+        """ Drop rows keeping the order, returns the old -> new row mapping """
+        size = self._size[table]
+        keep = np.ones(size, dtype=bool)
+        keep[rows] = False
+        new_size = int(keep.sum())
+        for array in self._columns[table].values():
+            array[:new_size] = array[:size][keep]
+            if array.dtype == object:
+                array[new_size:size] = None
+        self._size[table] = new_size
+        ids = self.ids(table)
+        self._rows[table] = dict(zip(ids.tolist(), range(new_size)))
+        remap = np.cumsum(keep) - 1
+        remap[~keep] = -1
+        return remap
+
+    def remove_edges(self, ids):
+        """ Remove edges by id """
+        ids = [id_ for id_ in ids if id_ in self._rows["edges"]]
+        if not ids:
+            return []
+        if self._adjacency is not None:
+            self._unindex_edges(ids)
+        self._compact("edges", self.rows("edges", ids))
+        return ids
+
+    def remove_nodes(self, ids):
+        """
+        Remove nodes by id together with their edges, returns the ids of the
+        removed edges.
+        """
+        ids = [id_ for id_ in ids if id_ in self._rows["nodes"]]
+        if not ids:
+            return []
+        edge_ids = list(dict.fromkeys(
+            e for id_ in ids
+            for e in self.in_edge_ids(id_) + self.out_edge_ids(id_)))
+        self.remove_edges(edge_ids)
+        if self._spatial is not None:
+            self._spatial.remove(ids)
+        for id_ in ids:
+            self._adjacency["in"].pop(id_, None)
+            self._adjacency["out"].pop(id_, None)
+        remap = self._compact("nodes", self.rows("nodes", ids))
+        for name in ("source", "target"):
+            column = self.column("edges", name)
+            column[:] = remap[column]
+        return edge_ids
+
+    def snapshot(self, table, ids):
+        """
+        Copy of the columns of the given rows, edges reference their nodes
+        by id, so the rows can be added back with restore.
+        """
+        columns = self._take(table, self.rows(table, ids))
+        if table == "edges":
+            node_ids = self.ids("nodes")
+            columns["source"] = node_ids[columns["source"]]
+            columns["target"] = node_ids[columns["target"]]
+        return columns
+
+    def restore(self, nodes=None, edges=None):
+        """ Add back snapshots of rows, returns the node and edge rows """
+        node_rows = edge_rows = np.empty(0, dtype=np.int64)
+        if nodes is not None and len(nodes["id"]):
+            node_rows = self.add_nodes(
+                nodes["id"], nodes["x"], nodes["y"], names=nodes["name"],
+                selected=nodes["selected"], react_props=nodes["react_props"])
+        if edges is not None and len(edges["id"]):
+            edge_rows = self.add_edges(
+                edges["id"], edges["source"], edges["target"],
+                weights=edges["weight"], selected=edges["selected"],
+                react_props=edges["react_props"])
+        return node_rows, edge_rows
+
+    def _add_items(self, table, items):
+        fields = list(zip(*map(
+            _node_fields if table == "nodes" else _edge_fields, items)))
+        if not fields:
+            return np.empty(0, dtype=np.int64)
+        ids, a, b, c, selected, props = fields
+        if table == "nodes":
+            return self.add_nodes(ids, a, b, names=c, selected=selected,
+                                  react_props=props)
+        return self.add_edges(ids, a, b, weights=c, selected=selected,
+                              react_props=props)
+
+    def apply_records(self, table, changes):
+        """
+        Apply React Flow change records ('position', 'select', 'add',
+        'replace' and 'remove') to a table, e.g. to replay a change log.
+        """
+        rows = self._rows[table]
+        for change in changes:
+            kind = change["type"]
+            if kind == "add":
+                if change["item"]["id"] not in rows:
+                    self._add_items(table, [change["item"]])
+            elif change.get("id") not in rows:
+                continue
+            elif kind == "position":
+                position = change["position"]
+                self.set_positions([change["id"]], [position["x"]],
+                                   [position["y"]])
+            elif kind == "select":
+                self.set_values(table, "selected", [change["id"]],
+                                [change["selected"]])
+            elif kind == "remove":
+                if table == "nodes":
+                    self.remove_nodes([change["id"]])
+                else:
+                    self.remove_edges([change["id"]])
+            elif kind == "replace" and "item" in change:
+                row = (NodeRow if table == "nodes" else EdgeRow)(
+                    self, change["id"])
+                if table == "nodes":
+                    _, x, y, name, selected, props = _node_fields(change["item"])
+                    row.xy, row.name = (x, y), name
+                else:
+                    _, _, _, weight, selected, props = _edge_fields(
+                        change["item"])
+                    row.weight = weight
+                row.selected, row.react_props = selected, props
+
+    def set_positions(self, ids, x, y):
+        rows = self.rows("nodes", ids)
+        self._columns["nodes"]["x"][rows] = x
+        self._columns["nodes"]["y"][rows] = y
+        if self._spatial is not None:
+            self._spatial.move(ids, self._columns["nodes"]["x"][rows],
+                               self._columns["nodes"]["y"][rows])
+
+    def set_values(self, table, column, ids, values):
+        """ Set a column for the given ids, e.g. 'selected' or 'name' """
+        self._columns[table][column][self.rows(table, ids)] = values
+        if table == "nodes" and column in ("x", "y"):
+            self._spatial = None
+
+    ###########################################################################
+    ## Adjacency
+    ###########################################################################
+    def _build_adjacency(self):
+        self._adjacency = {"in": defaultdict(dict), "out": defaultdict(dict)}
+        self._index_edges(np.arange(self.n_edges))
+
+    def _index_edges(self, rows):
+        node_ids = self.ids("nodes")
+        edge_ids = self.ids("edges")
+        sources = self.column("edges", "source")
+        targets = self.column("edges", "target")
+        adjacency_in, adjacency_out = self._adjacency["in"], self._adjacency["out"]
+        for row in rows:
+            adjacency_out[node_ids[sources[row]]][edge_ids[row]] = None
+            adjacency_in[node_ids[targets[row]]][edge_ids[row]] = None
+
+    def _unindex_edges(self, ids):
+        node_ids = self.ids("nodes")
+        sources = self.column("edges", "source")
+        targets = self.column("edges", "target")
+        for id_ in ids:
+            row = self._rows["edges"][id_]
+            self._adjacency["out"][node_ids[sources[row]]].pop(id_, None)
+            self._adjacency["in"][node_ids[targets[row]]].pop(id_, None)
+
+    def out_edge_ids(self, id_):
+        if self._adjacency is None:
+            self._build_adjacency()
+        return list(self._adjacency["out"].get(id_, ()))
+
+    def in_edge_ids(self, id_):
+        if self._adjacency is None:
+            self._build_adjacency()
+        return list(self._adjacency["in"].get(id_, ()))
+
+    ###########################################################################
+    ## Spatial
+    ###########################################################################
+    def spatial_index(self, cell_size=None):
+        """
+        The grid index over the node positions, built on first use and kept
+        up to date as nodes are added, moved and removed. A different
+        cell_size rebuilds it, cells about the size of a node work best.
+        """
+        if self._spatial is None or (
+                cell_size is not None and cell_size != self._spatial.cell_size):
+            self._spatial = GridIndex(self._node_positions,
+                                      cell_size or 250.)
+            self._spatial.insert(self.ids("nodes"), self.column("nodes", "x"),
+                                 self.column("nodes", "y"))
+        return self._spatial
+
+    def _node_positions(self, ids):
+        rows = self.rows("nodes", ids)
+        return self._columns["nodes"]["x"][rows], self._columns["nodes"]["y"][rows]
+
+    def nodes_in_box(self, x0, y0, x1, y1):
+        """ Ids of the nodes positioned inside the box, in row order """
+        ids = self.spatial_index().box(x0, y0, x1, y1)
+        return sorted(ids, key=self._rows["nodes"].__getitem__)
+
+    def nearest_nodes(self, x, y, k=1):
+        """ Ids of the k nodes closest to the point, closest first """
+        return self.spatial_index().nearest(x, y, k)[0]
+
+    def overlapping_nodes(self, width=150., height=40.):
+        """
+        Pairs of ids of nodes overlapping each other, nodes being boxes of
+        the given size anchored at their position (top left corner).
+        """
+        return self.spatial_index().overlaps(width, height)
+
+    ###########################################################################
+    ## Views
+    ###########################################################################
+    def _take(self, table, rows):
+        columns = self._columns[table]
+        if rows is None:
+            return {k: v[:self._size[table]].copy() for k, v in columns.items()}
+        rows = np.asarray(rows, dtype=np.int64)
+        return {k: v[rows] for k, v in columns.items()}
+
+    def nodes_to_reactflow(self, rows=None):
+        c = self._take("nodes", rows)
+        return [{
+            "id": id_,
+            "position": {"x": x, "y": y},
+            "data": {"label": name},
+            "selected": selected,
+            **react_props,
+        } for id_, x, y, name, selected, react_props in zip(
+            c["id"], c["x"].tolist(), c["y"].tolist(), c["name"],
+            c["selected"].tolist(), c["react_props"])]
+
+    def edges_to_reactflow(self, rows=None):
+        c = self._take("edges", rows)
+        node_ids = self.ids("nodes")
+        return [{
+            "id": id_,
+            "source": source,
+            "target": target,
+            "data": {"weight": None if weight != weight else weight},
+            "selected": selected,
+            **react_props,
+        } for id_, source, target, weight, selected, react_props in zip(
+            c["id"], node_ids[c["source"]], node_ids[c["target"]],
+            c["weight"].tolist(), c["selected"].tolist(), c["react_props"])]
+
+    def to_reactflow(self):
+        return self.nodes_to_reactflow(), self.edges_to_reactflow()
+
+    def nodes_to_tabular(self, rows=None):
+        c = self._take("nodes", rows)
+        return pd.DataFrame({
+            "id": c["id"], "x": c["x"], "y": c["y"], "name": c["name"],
+        }, index=rows)
+
+    def edges_to_tabular(self, rows=None):
+        c = self._take("edges", rows)
+        node_ids = self.ids("nodes")
+        names = self.column("nodes", "name")
+        return pd.DataFrame({
+            "source_id": node_ids[c["source"]],
+            "target_id": node_ids[c["target"]],
+            "source_name": names[c["source"]],
+            "target_name": names[c["target"]],
+            "weight": c["weight"],
+        }, index=rows)
+
+    def to_tabular(self):
+        return self.nodes_to_tabular(), self.edges_to_tabular()
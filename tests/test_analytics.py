@@ -0,0 +1,28 @@
+from src.reactflow import ReactFlowEditor
+
+
+def make_chain(n):
+    editor = ReactFlowEditor()
+    for i in range(n):
+        editor.add_node(str(i), xy=(i * 10., 0.), id_=str(i))
+    for i in range(n - 1):
+        editor.add_edge(str(i), str(i + 1))
+    return editor
+
+
+def test_rename_node_with_analytics():
+    editor = make_chain(4)
+    assert [n.id_ for n in editor.downstream(["0"])] == ["0", "1", "2", "3"]
+    # the edges of a renamed node get replace records without item
+    editor.update_node("1", name="renamed")
+    assert [n.id_ for n in editor.downstream(["1"])] == ["1", "2", "3"]
+    editor.remove_edges(["1 -> 2"])
+    assert [n.id_ for n in editor.downstream(["0"])] == ["0", "1"]
+
+
+def test_rename_node_with_lineage():
+    editor = make_chain(3)
+    editor.lineage = "downstream"
+    editor.update_node("1", selected=True)
+    editor.update_node("1", name="renamed")
+    assert editor._reactflow.highlighted["nodes"] == ["1", "2"]